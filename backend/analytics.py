@@ -0,0 +1,254 @@
+"""
+Cohort analytics rollups
+
+Each rollup is an aggregation pipeline that groups a source collection by
+week inside MongoDB and $merges the result into a materialized collection.
+Refreshes are incremental: only weeks at or after the stored high-water mark
+(pulled back by ANALYTICS_LOOKBACK_WEEKS to catch late conversions) are
+recomputed. Exports stream the rollup collections through cursors into
+columnar files, one batch at a time.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from pymongo import ASCENDING, DESCENDING
+import os
+
+ANALYTICS_LOOKBACK_WEEKS = int(os.environ.get("ANALYTICS_LOOKBACK_WEEKS", 4))
+FREE_REFLECTION_LIMIT = int(os.environ.get("FREE_REFLECTION_LIMIT", 1))
+EXPORT_BATCH_SIZE = 1000
+
+
+def week_of(field: str) -> dict:
+    return {"$dateTrunc": {"date": field, "unit": "week"}}
+
+
+def ratio(numerator: str, denominator: str) -> dict:
+    return {"$cond": [{"$gt": [denominator, 0]}, {"$divide": [numerator, denominator]}, 0]}
+
+
+def weekly_signups(since: datetime) -> list:
+    """Signup-to-paid conversion and free quota exhaustion by signup week"""
+    return [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": week_of("$created_at"),
+            "signups": {"$sum": 1},
+            "paid": {"$sum": {"$cond": ["$has_paid", 1, 0]}},
+            "beta_testers": {"$sum": {"$cond": ["$is_beta_tester", 1, 0]}},
+            "free_quota_exhausted": {"$sum": {"$cond": [
+                {"$and": [
+                    {"$not": ["$has_paid"]},
+                    {"$gte": ["$free_reflections_used", FREE_REFLECTION_LIMIT]}
+                ]},
+                1,
+                0
+            ]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "week": "$_id",
+            "signups": 1,
+            "paid": 1,
+            "beta_testers": 1,
+            "free_quota_exhausted": 1,
+            "conversion_rate": ratio("$paid", "$signups"),
+            "quota_exhaustion_rate": ratio("$free_quota_exhausted", "$signups")
+        }}
+    ]
+
+
+def weekly_payments(since: datetime) -> list:
+    """Checkout sessions, completed payments and revenue by week"""
+    return [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": week_of("$created_at"),
+            "sessions": {"$sum": 1},
+            "paid": {"$sum": {"$cond": [{"$eq": ["$payment_status", "paid"]}, 1, 0]}},
+            "revenue": {"$sum": {"$cond": [{"$eq": ["$payment_status", "paid"]}, "$amount", 0]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "week": "$_id",
+            "sessions": 1,
+            "paid": 1,
+            "revenue": 1,
+            "completion_rate": ratio("$paid", "$sessions")
+        }}
+    ]
+
+
+def beta_cohorts(since: datetime) -> list:
+    """Beta signups per week and how many registered and paid"""
+    return [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "email",
+            "foreignField": "email",
+            "pipeline": [{"$project": {"_id": 0, "has_paid": 1}}],
+            "as": "user"
+        }},
+        {"$group": {
+            "_id": week_of("$created_at"),
+            "signups": {"$sum": 1},
+            "registered": {"$sum": {"$cond": [{"$gt": [{"$size": "$user"}, 0]}, 1, 0]}},
+            "paid": {"$sum": {"$cond": [{"$anyElementTrue": ["$user.has_paid"]}, 1, 0]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "week": "$_id",
+            "signups": 1,
+            "registered": 1,
+            "paid": 1,
+            "registration_rate": ratio("$registered", "$signups")
+        }}
+    ]
+
+
+def beta_retention(since: datetime) -> list:
+    """Distinct reflecting users per beta cohort week and activity week"""
+    return [
+        {"$match": {"created_at": {"$gte": since}}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "activity_week": week_of("$created_at")}
+        }},
+        {"$lookup": {
+            "from": "users",
+            "localField": "_id.user_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "email": 1}}],
+            "as": "user"
+        }},
+        {"$unwind": "$user"},
+        {"$lookup": {
+            "from": "beta_signups",
+            "localField": "user.email",
+            "foreignField": "email",
+            "pipeline": [{"$project": {"_id": 0, "created_at": 1}}],
+            "as": "signup"
+        }},
+        {"$unwind": "$signup"},
+        {"$group": {
+            "_id": {"cohort_week": week_of("$signup.created_at"), "activity_week": "$_id.activity_week"},
+            "active_users": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "cohort_week": "$_id.cohort_week",
+            "activity_week": "$_id.activity_week",
+            "weeks_since_signup": {"$dateDiff": {
+                "startDate": "$_id.cohort_week",
+                "endDate": "$_id.activity_week",
+                "unit": "week"
+            }},
+            "active_users": 1
+        }}
+    ]
+
+
+# name -> (source collection, time field, pipeline builder, merge key)
+ROLLUPS = {
+    "weekly_signups": ("users", "created_at", weekly_signups, ["week"]),
+    "weekly_payments": ("payment_transactions", "created_at", weekly_payments, ["week"]),
+    "beta_cohorts": ("beta_signups", "created_at", beta_cohorts, ["week"]),
+    "beta_retention": ("reflections", "created_at", beta_retention, ["cohort_week", "activity_week"]),
+}
+
+
+def rollup_collection(name: str) -> str:
+    return f"analytics_{name}"
+
+
+def week_start(moment: datetime) -> datetime:
+    """Start of the (Sunday-based) week, matching $dateTrunc's default"""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+async def refresh_rollup(db, name: str, full: bool = False) -> dict:
+    """Recompute the weeks touched since the last refresh and merge them in"""
+    source, time_field, build_pipeline, merge_on = ROLLUPS[name]
+    state = await db.analytics_state.find_one({"_id": name}) or {}
+
+    # Take the new high-water mark before aggregating, so documents written
+    # mid-run fall in a week that the next refresh recomputes
+    latest = await db[source].find_one({}, {"_id": 0, time_field: 1}, sort=[(time_field, DESCENDING)])
+    high_water = latest[time_field] if latest else None
+
+    if full or not state.get("high_water"):
+        since = datetime.min
+    else:
+        lookback = datetime.utcnow() - timedelta(weeks=ANALYTICS_LOOKBACK_WEEKS)
+        since = week_start(min(state["high_water"], lookback))
+
+    pipeline = build_pipeline(since) + [{"$merge": {
+        "into": rollup_collection(name),
+        "on": merge_on,
+        "whenMatched": "replace",
+        "whenNotMatched": "insert"
+    }}]
+    await db[source].aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    await db.analytics_state.update_one(
+        {"_id": name},
+        {"$set": {"high_water": high_water, "since": since, "refreshed_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return {"rollup": name, "since": since, "high_water": high_water}
+
+
+async def _batches(cursor, size: int):
+    batch = []
+    async for row in cursor:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def export_rollup(db, name: str, out_dir: Path, file_format: str = "parquet") -> Path:
+    """
+    Stream a rollup collection through a cursor into a columnar file.
+
+    Each batch is written as it arrives (a Parquet row group, or appended
+    CSV rows), so memory is bounded by EXPORT_BATCH_SIZE, not the rollup.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _, _, _, merge_on = ROLLUPS[name]
+    sort = [(field, ASCENDING) for field in merge_on]
+    cursor = db[rollup_collection(name)].find({}, {"_id": 0}).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{name}.{file_format}"
+    columns = None
+    writer = None
+    try:
+        async for batch in _batches(cursor, EXPORT_BATCH_SIZE):
+            # Later batches keep the first batch's columns and types
+            frame = pd.DataFrame.from_records(batch, columns=columns)
+            if file_format == "parquet":
+                schema = writer.schema if writer else None
+                table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                frame.to_csv(path, mode="w" if columns is None else "a", header=columns is None, index=False)
+            columns = list(frame.columns)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if columns is None:
+        empty = pd.DataFrame()
+        if file_format == "parquet":
+            empty.to_parquet(path, index=False)
+        else:
+            empty.to_csv(path, index=False)
+    return path
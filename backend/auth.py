@@ -1,26 +1,163 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional
+from cache import TTLCache
+from lazy import lazy_import
+from metrics import registry, Gauge, PASSWORD_HASH_QUEUE, PASSWORD_HASH_LATENCY, PASSWORD_HASH_REJECTED
+import asyncio
+import hashlib
+import time
 import os
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import env  # noqa: F401
 
 # JWT settings
 SECRET_KEY = os.environ["JWT_SECRET_KEY"]  # Must be set in .env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+JWT_BACKEND = os.environ.get("JWT_BACKEND", "jose")  # jose or pyjwt
+
+# Verified token payloads keyed by token digest
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get("TOKEN_CACHE_TTL_SECONDS", 300))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+# Password hashing pool settings
+PASSWORD_HASH_EXECUTOR = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")  # thread or process
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 32))
+
+
+@lru_cache(maxsize=None)
+def password_context():
+    """bcrypt context, built on first use (also in each pool process)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+
+def _timed_call(submitted: float, func, *args):
+    """
+    Run func in a pool worker, returning how long it waited for the worker.
+    Monotonic time is system-wide, so this also holds for the process pool.
+    """
+    return time.monotonic() - submitted, func(*args)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool has no free queue slots"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a bounded worker pool so the
+    event loop keeps serving other requests while a password is checked.
+
+    At most ``max_workers + max_queue`` calls may be pending at once; any
+    call beyond that fails fast with ``PasswordHasherBusy``.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, executor: str = "thread"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor_kind = executor
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # Imported here: multiprocessing is slow to import and unused by default
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.max_workers + self.max_queue:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusy()
+
+        self.pending += 1
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            queued, result = await loop.run_in_executor(self._get_executor(), _timed_call, submitted, func, *args)
+            PASSWORD_HASH_QUEUE.observe(queued, (operation,))
+            PASSWORD_HASH_LATENCY.observe(time.monotonic() - submitted, (operation,))
+            return result
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    executor=PASSWORD_HASH_EXECUTOR
+)
+registry.register(Gauge(
+    "password_hash_pending", "bcrypt calls running or queued",
+    func=lambda: password_hasher.pending
+))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash without blocking the event loop"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await password_hasher.hash(password)
+
+
+# JWT libraries load on the first token issued or checked
+if JWT_BACKEND == "pyjwt":
+    pyjwt = lazy_import("jwt")
+
+    def _jwt_encode(claims: dict) -> str:
+        return pyjwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def _jwt_decode(token: str) -> Optional[dict]:
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except pyjwt.PyJWTError:
+            return None
+else:
+    jwt = lazy_import("jose.jwt")
+
+    def _jwt_encode(claims: dict) -> str:
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+    def _jwt_decode(token: str) -> Optional[dict]:
+        try:
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.JWTError:
+            return None
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -32,14 +169,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _jwt_encode(to_encode)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
         return payload
-    except JWTError:
+
+    payload = _jwt_decode(token)
+    if payload is None:
         return None
+
+    # Never keep a payload past its own expiry: an expired token must fail
+    # here exactly as it would uncached. (Tokens are not revocable, so exp is
+    # the only thing that ends one.)
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return payload
@@ -0,0 +1,98 @@
+"""
+Login burst benchmark
+
+Fires concurrent logins at a running backend while polling /health, then
+prints p50/p99 latency for both. With bcrypt running on the hashing pool,
+/health latency should stay flat no matter how many logins are in flight.
+
+Usage:
+    REACT_APP_BACKEND_URL=http://localhost:8001 python benchmarks/bench_login.py --concurrency 50
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001').rstrip('/')
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    response = func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+
+def poll_health(stop, samples):
+    session = requests.Session()
+    while not stop.is_set():
+        elapsed, _ = timed(session.get, f"{BASE_URL}/health")
+        samples.append(elapsed)
+        time.sleep(0.05)
+
+
+def report(name, samples):
+    print(
+        f"{name:<8} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.1f}ms "
+        f"p99={percentile(samples, 99):8.1f}ms "
+        f"max={max(samples, default=0):8.1f}ms "
+        f"mean={statistics.fmean(samples) if samples else 0:8.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    email = f"bench_login_{uuid.uuid4().hex[:8]}@example.com"
+    password = "BenchPassword123!"
+    response = requests.post(f"{BASE_URL}/api/auth/signup", json={"email": email, "password": password})
+    response.raise_for_status()
+
+    # Baseline /health latency with no login traffic
+    idle_health = [timed(requests.get, f"{BASE_URL}/health")[0] for _ in range(20)]
+
+    stop = threading.Event()
+    health_samples = []
+    poller = threading.Thread(target=poll_health, args=(stop, health_samples))
+    poller.start()
+
+    login_samples = []
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(timed, requests.post, f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+            for _ in range(args.requests)
+        ]
+        for future in futures:
+            elapsed, status = future.result()
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                login_samples.append(elapsed)
+
+    stop.set()
+    poller.join()
+
+    print(f"Logins: {args.requests} at concurrency {args.concurrency}, status codes {statuses}")
+    report("health0", idle_health)
+    report("login", login_samples)
+    report("health", health_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Serialization micro-benchmark
+
+Measures CPU time per request (process time, so waiting on the event loop
+does not count) for /api/auth/me, /api/auth/access-check and /api/status,
+in-process over httpx's ASGI transport with a mongomock-motor database.
+Each response mode runs in its own interpreter, since FAST_JSON is read at
+import time. To get numbers from before a change, run a copy of this
+script against the older checkout.
+
+Usage:
+    python benchmarks/bench_serialization.py --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+MODES = {"standard": "false", "orjson": "true"}
+STATUS_ROWS = 100
+
+
+async def measure(requests: int) -> dict:
+    import database
+    import server
+    import httpx
+    from mongomock_motor import AsyncMongoMockClient
+
+    database.use_client(AsyncMongoMockClient())
+    started_at = datetime.utcnow()
+    await database.db.status_checks.insert_many([
+        {"id": f"status-{index:04d}", "client_name": "bench", "timestamp": started_at + timedelta(seconds=index)}
+        for index in range(STATUS_ROWS)
+    ])
+
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post(
+                "/api/auth/signup", json={"email": "serialization@example.com", "password": "BenchPassword123!"}
+            )
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            endpoints = {
+                "GET /api/auth/me": ("/api/auth/me", headers),
+                "GET /api/auth/access-check": ("/api/auth/access-check", headers),
+                f"GET /api/status?limit={STATUS_ROWS}": (f"/api/status?limit={STATUS_ROWS}", {}),
+            }
+            for label, (url, request_headers) in endpoints.items():
+                # Warm caches and code paths before timing
+                for _ in range(50):
+                    (await client.get(url, headers=request_headers)).raise_for_status()
+                cpu_started = time.process_time()
+                for _ in range(requests):
+                    await client.get(url, headers=request_headers)
+                results[label] = (time.process_time() - cpu_started) / requests * 1e6
+    return results
+
+
+def run_mode(mode: str, requests: int) -> dict:
+    env = dict(os.environ, FAST_JSON=MODES[mode], PAYMENT_PROVIDER="stub", MONGO_ENSURE_INDEXES="false")
+    output = subprocess.run(
+        [sys.executable, __file__, "--requests", str(requests), "--child"],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(asyncio.run(measure(args.requests))))
+        return
+
+    results = {mode: run_mode(mode, args.requests) for mode in MODES}
+    print(f"{'endpoint':<32} " + " ".join(f"{mode + ' us/req':>16}" for mode in MODES))
+    for label in results["standard"]:
+        print(f"{label:<32} " + " ".join(f"{results[mode][label]:>16.1f}" for mode in MODES))
+
+
+if __name__ == "__main__":
+    main()
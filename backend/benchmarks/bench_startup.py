@@ -0,0 +1,114 @@
+"""
+Cold start benchmark
+
+Measures two things in fresh interpreters, several times each:
+
+    import     cumulative `python -X importtime -c "import server"` time
+    ready      time from spawning uvicorn to the first 200 from /health/live
+
+and lists the modules with the most self import time, to show what to defer
+next. Exits non-zero when the median exceeds a budget, so it can gate CI.
+Index creation is skipped unless --ensure-indexes is passed, so no MongoDB
+is needed.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --import-budget-ms 700 --ready-budget-ms 1500
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 800))
+READY_BUDGET_MS = float(os.environ.get("STARTUP_READY_BUDGET_MS", 2000))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_import(env: dict):
+    """Return (cumulative ms for server, {module: self ms})"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    total = 0.0
+    self_times = {}
+    for match in IMPORTTIME_LINE.finditer(stderr):
+        self_us, cumulative_us, _, module = match.groups()
+        self_times[module] = int(self_us) / 1000
+        if module == "server":
+            total = int(cumulative_us) / 1000
+    return total, self_times
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_ready(env: dict, timeout: float = 30) -> float:
+    """Milliseconds from spawning uvicorn until /health/live answers"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/live", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            time.sleep(0.01)
+        raise RuntimeError("timed out waiting for /health/live")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="heaviest modules to list")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--ready-budget-ms", type=float, default=READY_BUDGET_MS)
+    parser.add_argument("--ensure-indexes", action="store_true", help="create indexes at startup (needs MongoDB)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, MONGO_ENSURE_INDEXES="true" if args.ensure_indexes else "false")
+
+    import_runs = [measure_import(env) for _ in range(args.runs)]
+    ready_runs = [measure_ready(env) for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in import_runs)
+    ready_ms = statistics.median(ready_runs)
+
+    print(f"import server   median {import_ms:8.1f} ms  (budget {args.import_budget_ms:.0f})  runs {[round(t) for t, _ in import_runs]}")
+    print(f"first /health   median {ready_ms:8.1f} ms  (budget {args.ready_budget_ms:.0f})  runs {[round(t) for t in ready_runs]}")
+
+    print(f"\nheaviest modules by self time (last run):")
+    _, self_times = import_runs[-1]
+    for module, self_ms in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_ms:8.1f} ms  {module}")
+
+    if import_ms > args.import_budget_ms or ready_ms > args.ready_budget_ms:
+        print("\nstartup budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Offline benchmark suite
+
+Runs the app in-process over httpx's ASGI transport, with the stub payment
+provider and either a mongomock-motor stand-in (default) or a local mongod,
+and drives these scenarios in order:
+
+    signup_burst      concurrent signups
+    login_burst       concurrent logins
+    me_polling        /auth/me polling with issued tokens
+    checkout_create   one checkout session per user
+    status_polling    /payments/checkout-status polling
+    webhook_flood     webhook deliveries, some redelivered, until the inbox drains
+    mixed             weighted mix of the above read paths
+
+Results are written as JSON: per scenario, throughput and p50/p95/p99 per
+endpoint. Pass --compare with an earlier run to print p95 changes, so runs
+from two commits can be compared. With mongomock every database call is
+served in-process, so the numbers measure the application's own overhead;
+use --mongo-url for end-to-end numbers against a real server.
+
+Usage:
+    python benchmarks/bench_suite.py --out bench.json
+    python benchmarks/bench_suite.py --compare bench.json --out bench-new.json
+    python benchmarks/bench_suite.py --mongo-url mongodb://localhost:27017 --users 500
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from bench_login import percentile  # noqa: E402
+
+PASSWORD = "BenchPassword123!"
+BENCH_ADMIN_KEY = "bench-admin"
+MIXED_WEIGHTS = {"me": 0.6, "status": 0.2, "login": 0.1, "ready": 0.1}
+
+
+class Recorder:
+    """Latency samples and status codes per endpoint for one scenario"""
+
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+
+    async def call(self, client, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = (time.perf_counter() - started) * 1000
+        self.samples.setdefault(label, []).append(elapsed)
+        statuses = self.statuses.setdefault(label, {})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response
+
+    def summary(self, duration: float) -> dict:
+        endpoints = {}
+        for label, samples in sorted(self.samples.items()):
+            endpoints[label] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / duration, 1) if duration else 0.0,
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "mean_ms": round(statistics.fmean(samples), 2),
+                "status_codes": {str(code): count for code, count in sorted(self.statuses[label].items())}
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            "duration_s": round(duration, 3),
+            "requests": total,
+            "throughput_rps": round(total / duration, 1) if duration else 0.0,
+            "endpoints": endpoints
+        }
+
+
+async def run_concurrent(count: int, concurrency: int, make_call):
+    """Run make_call(i) for i in range(count), at most `concurrency` at once"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index):
+        async with semaphore:
+            return await make_call(index)
+
+    return await asyncio.gather(*[bounded(index) for index in range(count)])
+
+
+async def scenario(results: dict, name: str, body):
+    recorder = Recorder()
+    started = time.perf_counter()
+    outcome = await body(recorder)
+    results[name] = recorder.summary(time.perf_counter() - started)
+    print(f"{name:<16} {results[name]['requests']:>6} requests  {results[name]['throughput_rps']:>8} req/s", file=sys.stderr)
+    return outcome
+
+
+async def drain_webhooks(client, timeout: float) -> float:
+    """Wait for the webhook inbox to empty; returns seconds waited"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        stats = (await client.get("/api/payments/webhook/queue-stats", headers={"X-Admin-Key": BENCH_ADMIN_KEY})).json()
+        if stats["queue_depth"] == 0:
+            break
+        await asyncio.sleep(0.05)
+    return time.perf_counter() - started
+
+
+async def run_suite(args) -> dict:
+    import database
+    import server
+
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+        database.use_client(AsyncMongoMockClient())
+
+    import httpx
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            users = [f"bench_{args.seed}_{index}@example.com" for index in range(args.users)]
+            tokens = {}
+
+            async def signups(recorder):
+                async def signup(index):
+                    response = await recorder.call(
+                        client, "POST /api/auth/signup", "POST", "/api/auth/signup",
+                        json={"email": users[index], "password": PASSWORD}
+                    )
+                    if response.status_code == 200:
+                        tokens[users[index]] = response.json()["access_token"]
+                await run_concurrent(len(users), args.concurrency, signup)
+
+            async def logins(recorder):
+                async def login(_):
+                    await recorder.call(
+                        client, "POST /api/auth/login", "POST", "/api/auth/login",
+                        json={"email": rng.choice(users), "password": PASSWORD}
+                    )
+                await run_concurrent(args.users, args.concurrency, login)
+
+            def auth(email):
+                return {"Authorization": f"Bearer {tokens[email]}"}
+
+            async def me_polls(recorder):
+                emails = list(tokens)
+
+                async def me(_):
+                    await recorder.call(client, "GET /api/auth/me", "GET", "/api/auth/me", headers=auth(rng.choice(emails)))
+                await run_concurrent(args.polls, args.concurrency, me)
+
+            sessions = {}
+
+            async def checkouts(recorder):
+                emails = list(tokens)
+
+                async def create(index):
+                    email = emails[index]
+                    response = await recorder.call(
+                        client, "POST /api/payments/create-checkout", "POST", "/api/payments/create-checkout",
+                        params={"package_id": "unlock_full_access", "origin_url": "http://bench"},
+                        headers=auth(email)
+                    )
+                    if response.status_code == 200:
+                        sessions[email] = response.json()["session_id"]
+                await run_concurrent(len(emails), args.concurrency, create)
+
+            await scenario(results, "signup_burst", signups)
+            await scenario(results, "login_burst", logins)
+            await scenario(results, "me_polling", me_polls)
+            await scenario(results, "checkout_create", checkouts)
+
+            # Half the sessions settle through status polling, half through webhooks
+            owned = sorted(sessions.items())
+            polled, delivered = owned[::2], owned[1::2]
+
+            async def poll_status(recorder):
+                email, session_id = rng.choice(polled)
+                await recorder.call(
+                    client, "GET /api/payments/checkout-status/{session_id}", "GET",
+                    f"/api/payments/checkout-status/{session_id}", headers=auth(email)
+                )
+
+            async def status_polls(recorder):
+                async def status(_):
+                    await poll_status(recorder)
+                await run_concurrent(args.polls, args.concurrency, status)
+
+            async def webhooks(recorder):
+                events = [{"event_id": f"evt_bench_{uuid.uuid4().hex}", "session_id": s} for _, s in delivered]
+                redeliveries = rng.sample(events, int(len(events) * args.redelivery_ratio))
+                deliveries = events + redeliveries
+                rng.shuffle(deliveries)
+
+                async def deliver(index):
+                    await recorder.call(
+                        client, "POST /api/payments/webhook/stripe", "POST", "/api/payments/webhook/stripe",
+                        content=json.dumps(deliveries[index]), headers={"Stripe-Signature": "bench"}
+                    )
+                await run_concurrent(len(deliveries), args.concurrency, deliver)
+                return await drain_webhooks(client, timeout=60)
+
+            if polled:
+                await scenario(results, "status_polling", status_polls)
+            if delivered:
+                drain_seconds = await scenario(results, "webhook_flood", webhooks)
+                results["webhook_flood"]["drain_s"] = round(drain_seconds, 3)
+
+            async def mixed(recorder):
+                kinds = list(MIXED_WEIGHTS)
+                weights = list(MIXED_WEIGHTS.values())
+                emails = list(tokens)
+
+                async def request(_):
+                    kind = rng.choices(kinds, weights)[0]
+                    if kind == "me":
+                        await recorder.call(client, "GET /api/auth/me", "GET", "/api/auth/me", headers=auth(rng.choice(emails)))
+                    elif kind == "status" and polled:
+                        await poll_status(recorder)
+                    elif kind == "login":
+                        await recorder.call(
+                            client, "POST /api/auth/login", "POST", "/api/auth/login",
+                            json={"email": rng.choice(users), "password": PASSWORD}
+                        )
+                    else:
+                        await recorder.call(client, "GET /health/ready", "GET", "/health/ready")
+                await run_concurrent(args.polls, args.concurrency, request)
+
+            await scenario(results, "mixed", mixed)
+
+            if args.mongo_url:
+                await database.get_client().drop_database(database.DB_NAME)
+
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline: dict, current: dict):
+    """Print p95 per endpoint against a baseline run"""
+    print(f"p95 vs {baseline['meta']['commit']}:", file=sys.stderr)
+    for name, result in current["scenarios"].items():
+        base_endpoints = baseline["scenarios"].get(name, {}).get("endpoints", {})
+        for label, stats in result["endpoints"].items():
+            base = base_endpoints.get(label)
+            if not base or not base["p95_ms"]:
+                continue
+            change = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+            print(f"  {name:<16} {label:<52} {base['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f} ms ({change:+.1f}%)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=2000, help="requests per polling scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--redelivery-ratio", type=float, default=0.2, help="fraction of webhooks delivered twice")
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="stub payment provider latency, seconds")
+    parser.add_argument("--mongo-url", help="benchmark against this mongod instead of mongomock")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="earlier JSON result to compare p95 against")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure them before importing the app
+    os.environ["PAYMENT_PROVIDER"] = "stub"
+    os.environ["PAYMENT_STUB_LATENCY_SECONDS"] = str(args.provider_latency)
+    os.environ["DB_NAME"] = f"mindspace_bench_{uuid.uuid4().hex[:8]}"
+    os.environ["MONGO_URL"] = args.mongo_url or os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    os.environ["ADMIN_API_KEY"] = BENCH_ADMIN_KEY
+    # Every simulated user shares one client IP, which the limiter would throttle
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    # Keep per-request log lines out of the timings
+    logging.disable(logging.WARNING)
+    try:
+        results = asyncio.run(run_suite(args))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "mongo": "mongod" if args.mongo_url else "mongomock",
+            "users": args.users,
+            "polls": args.polls,
+            "concurrency": args.concurrency,
+            "provider_latency_s": args.provider_latency,
+            "seed": args.seed
+        },
+        "scenarios": results
+    }
+    text = json.dumps(output, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), output)
+
+
+if __name__ == "__main__":
+    main()
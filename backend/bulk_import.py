@@ -0,0 +1,253 @@
+"""
+Bulk beta signup import and beta tester promotion
+
+Rows come from a CSV (an "email" column, or the first column when there is
+no header) or NDJSON ({"email": ...} per line) stream. They are read in
+batches of IMPORT_BATCH_SIZE; each batch is validated with email-validator
+in a worker thread and written with one unordered bulk_write of upserts, so
+existing signups are left untouched and one bad row does not stop the rest.
+With promote, users whose email is in the batch are flagged as beta testers
+in the same pass. promote_beta_testers() does the same for every existing
+signup by joining beta_signups to users inside MongoDB.
+
+Promoted users are invalidated in every worker's user cache, as a payment
+unlock does, so /auth/me reflects the flag right away.
+
+Only email-validator's public validate_email() is used, imported on first
+use. Addresses seen again (duplicates in a file, re-imports of a cohort)
+come from a cache.
+"""
+from datetime import datetime
+from functools import lru_cache
+from lazy import lazy_import
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from invalidation import invalidate_many_everywhere
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple
+import asyncio
+import csv
+import json
+import os
+import time
+import uuid
+
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+IMPORT_FORMATS = ("csv", "ndjson")
+# Invalid rows reported per batch; the rest are only counted
+MAX_REPORTED_ERRORS = 10
+DUPLICATE_KEY = 11000
+# Batch report fields that are not counts
+UNSUMMED_FIELDS = ("batch", "seconds", "rows_per_second", "errors")
+
+email_validator = lazy_import("email_validator")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream (e.g. a request body) into decoded lines"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig")
+    if pending:
+        yield pending.decode("utf-8-sig")
+
+
+async def aiter_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    """Adapt a file or other iterable of lines"""
+    for line in lines:
+        yield line
+
+
+async def iter_emails(lines: AsyncIterable[str], format: str) -> AsyncIterator[str]:
+    """Raw email values, one per data row; blank lines are skipped"""
+    if format not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported import format: {format}")
+
+    column = None
+    async for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if format == "ndjson":
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line
+                continue
+            yield row.get("email", "") if isinstance(row, dict) else str(row)
+            continue
+
+        row = next(csv.reader([line]))
+        if column is None:
+            header = [field.strip().lower() for field in row]
+            column = header.index("email") if "email" in header else 0
+            if "email" in header:
+                continue
+        yield row[column] if column < len(row) else ""
+
+
+@lru_cache(maxsize=10000)
+def normalize_email(email: str) -> str:
+    """validate_email(...).normalized, raising EmailNotValidError likewise"""
+    return email_validator.validate_email(email, check_deliverability=False).normalized
+
+
+def validate_batch(emails: List[str]) -> Tuple[List[str], List[dict]]:
+    """Normalized unique valid emails, and the invalid rows with reasons"""
+    valid, invalid, seen = [], [], set()
+    for email in emails:
+        try:
+            normalized = normalize_email(email.strip())
+        except email_validator.EmailNotValidError as e:
+            invalid.append({"email": email, "error": str(e)})
+            continue
+        if normalized not in seen:
+            seen.add(normalized)
+            valid.append(normalized)
+    return valid, invalid
+
+
+def signup_upsert(email: str, now: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"email": email},
+        {"$setOnInsert": {"id": str(uuid.uuid4()), "email": email, "created_at": now, "status": "pending"}},
+        upsert=True
+    )
+
+
+async def upsert_signups(db, emails: List[str]) -> int:
+    """Insert the emails not already signed up; returns how many were new"""
+    if not emails:
+        return 0
+    now = datetime.utcnow()
+    try:
+        result = await db.beta_signups.bulk_write([signup_upsert(email, now) for email in emails], ordered=False)
+        return result.upserted_count
+    except BulkWriteError as e:
+        # Two upserts racing on the same new email: the loser's row exists
+        # now, which is all an import needs
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get("nUpserted", 0)
+
+
+async def promote_emails(db, emails: List[str]) -> int:
+    """Flag the users with these emails as beta testers"""
+    if not emails:
+        return 0
+    query = {"email": {"$in": emails}, "is_beta_tester": {"$ne": True}}
+    # Most imported emails have no account; only invalidate the ones promoted
+    promoted = await db.users.distinct("email", query)
+    if not promoted:
+        return 0
+    result = await db.users.update_many(
+        {**query, "email": {"$in": promoted}},
+        {"$set": {"is_beta_tester": True}}
+    )
+    await invalidate_many_everywhere("users", promoted)
+    return result.modified_count
+
+
+async def import_signups(
+    db,
+    lines: AsyncIterable[str],
+    format: str,
+    promote: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> AsyncIterator[dict]:
+    """Import rows batch by batch, yielding a report after each batch"""
+    emails = iter_emails(lines, format)
+    batch_number = 0
+    exhausted = False
+    while not exhausted:
+        started = time.perf_counter()
+        rows = []
+        async for email in emails:
+            rows.append(email)
+            if len(rows) >= batch_size:
+                break
+        else:
+            exhausted = True
+        if not rows:
+            break
+
+        batch_number += 1
+        valid, invalid = await asyncio.to_thread(validate_batch, rows)
+        inserted = await upsert_signups(db, valid)
+        promoted = await promote_emails(db, valid) if promote else 0
+        seconds = time.perf_counter() - started
+        yield {
+            "batch": batch_number,
+            "rows": len(rows),
+            "valid": len(valid),
+            "invalid": len(invalid),
+            "inserted": inserted,
+            "existing": len(valid) - inserted,
+            "promoted": promoted,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(rows) / seconds) if seconds else None,
+            "errors": invalid[:MAX_REPORTED_ERRORS]
+        }
+
+
+def summarize(reports: List[dict], seconds: Optional[float] = None) -> dict:
+    """Totals of the counts in a run's batch reports"""
+    totals = {"batches": len(reports)}
+    for report in reports:
+        for field, value in report.items():
+            if field not in UNSUMMED_FIELDS:
+                totals[field] = totals.get(field, 0) + value
+    if seconds is not None:
+        totals["seconds"] = round(seconds, 4)
+        totals["rows_per_second"] = round(totals.get("rows", 0) / seconds) if seconds else None
+    return totals
+
+
+def unpromoted_signups() -> list:
+    """Emails of beta signups whose user exists and is not a tester yet"""
+    return [
+        {"$lookup": {
+            "from": "users",
+            "localField": "email",
+            "foreignField": "email",
+            "as": "user"
+        }},
+        {"$match": {"user.0": {"$exists": True}, "user.is_beta_tester": {"$ne": True}}},
+        {"$project": {"_id": 0, "email": 1}}
+    ]
+
+
+async def promote_beta_testers(db, batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[dict]:
+    """Promote every registered beta signup, yielding a report per batch"""
+    cursor = db.beta_signups.aggregate(unpromoted_signups(), batchSize=batch_size)
+    batch_number = 0
+    emails = []
+    started = time.perf_counter()
+
+    async def flush():
+        promoted = await promote_emails(db, emails)
+        seconds = time.perf_counter() - started
+        return {
+            "batch": batch_number,
+            "rows": len(emails),
+            "promoted": promoted,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(emails) / seconds) if seconds else None
+        }
+
+    async for signup in cursor:
+        emails.append(signup["email"])
+        if len(emails) >= batch_size:
+            batch_number += 1
+            yield await flush()
+            emails, started = [], time.perf_counter()
+    if emails:
+        batch_number += 1
+        yield await flush()
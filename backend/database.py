@@ -1,13 +1,227 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
-from pathlib import Path
+from pymongo import ReadPreference, monitoring
+from typing import Optional, TYPE_CHECKING
+from metrics import registry, Gauge, MONGO_COMMAND_LATENCY, MONGO_COMMAND_FAILURES
+import threading
 import os
+import env  # noqa: F401
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env', override=False)
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
-# MongoDB connection - shared across the application
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection settings
+MONGO_URL = os.environ['MONGO_URL']
+DB_NAME = os.environ['DB_NAME']
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_TIMEOUT_MS = int(os.environ.get('MONGO_TIMEOUT_MS', 5000))  # per-operation budget, 0 disables
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zlib')  # e.g. zstd,snappy,zlib
+MONGO_READ_ONLY_PREFERENCE = os.environ.get('MONGO_READ_ONLY_PREFERENCE', 'secondaryPreferred')
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters collected from pymongo pool events"""
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkout_failed = 0
+        self.pools_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failed += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "open_connections": self.created - self.closed,
+            "in_use": self.checked_out,
+            "created": self.created,
+            "closed": self.closed,
+            "checkout_failed": self.checkout_failed,
+            "pools_cleared": self.pools_cleared
+        }
+
+
+pool_stats = PoolStats()
+registry.register(Gauge(
+    "mongodb_pool_connections_open", "Open MongoDB pool connections",
+    func=lambda: pool_stats.created - pool_stats.closed
+))
+registry.register(Gauge(
+    "mongodb_pool_connections_in_use", "MongoDB pool connections checked out",
+    func=lambda: pool_stats.checked_out
+))
+
+
+class CommandTimings(monitoring.CommandListener):
+    """
+    Records MongoDB command latency per collection and command name.
+
+    Only the started event carries the command document, so the collection
+    is remembered by request ID until the matching succeeded/failed event.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else ""
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event) -> tuple:
+        with self._lock:
+            collection = self._pending.pop((event.connection_id, event.request_id), "")
+        return (collection, event.command_name)
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, self._finish(event))
+
+    def failed(self, event):
+        labels = self._finish(event)
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, labels)
+        MONGO_COMMAND_FAILURES.inc(labels)
+
+
+command_timings = CommandTimings()
+
+_client: Optional["AsyncIOMotorClient"] = None
+
+
+def create_client(timeout_ms: int = MONGO_TIMEOUT_MS) -> "AsyncIOMotorClient":
+    """Build a Motor client from the MONGO_* settings"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    options = {}
+    if timeout_ms:
+        options["timeoutMS"] = timeout_ms
+    return AsyncIOMotorClient(
+        MONGO_URL,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        compressors=MONGO_COMPRESSORS,
+        event_listeners=[pool_stats, command_timings],
+        **options
+    )
+
+
+def connect(timeout_ms: int = MONGO_TIMEOUT_MS) -> "AsyncIOMotorClient":
+    """
+    Open the shared client (idempotent); called from the app lifespan.
+    Offline commands pass timeout_ms=0 so long aggregations are not cut off.
+    """
+    global _client
+    if _client is None:
+        _client = create_client(timeout_ms)
+    return _client
+
+
+def use_client(client):
+    """Install an already-built client, e.g. an in-process stand-in for benchmarks"""
+    global _client
+    _client = client
+
+
+def close():
+    """Close the shared client; connect() must be called again before use"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_client() -> "AsyncIOMotorClient":
+    """
+    The shared client. Raises rather than connecting on first use, so a
+    query outside the app lifespan (or after shutdown) fails loudly instead
+    of quietly opening a pool nothing will close.
+    """
+    if _client is None:
+        raise RuntimeError("MongoDB client is not connected; call database.connect() first")
+    return _client
+
+
+class DatabaseProxy:
+    """
+    Module-level handle for the application database.
+
+    Resolves to the database on the client opened by connect(), so routes
+    can keep importing `db` while the client itself is created in the app
+    lifespan rather than at import time.
+    """
+
+    def __init__(self, read_preference=None):
+        self._read_preference = read_preference
+        self._client = None
+        self._db = None
+
+    def _database(self):
+        client = get_client()
+        if client is not self._client:
+            self._db = client.get_database(DB_NAME, read_preference=self._read_preference)
+            self._client = client
+        return self._db
+
+    def __getattr__(self, name):
+        return getattr(self._database(), name)
+
+    def __getitem__(self, name):
+        return self._database()[name]
+
+
+# MongoDB database - shared across the application
+db = DatabaseProxy()
+
+# Same database, reading from secondaries when available; for read-only
+# endpoints that tolerate slightly stale data
+read_db = DatabaseProxy(read_preference=READ_PREFERENCES[MONGO_READ_ONLY_PREFERENCE])
@@ -0,0 +1,11 @@
+"""
+Loads backend/.env into the environment, once per process.
+
+Modules that read settings at import time import this first, so the
+result does not depend on which module happens to be imported first.
+"""
+from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env', override=False)
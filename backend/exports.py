@@ -0,0 +1,45 @@
+"""
+Streaming NDJSON/CSV exports shared by the admin export endpoints
+"""
+from datetime import datetime
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List
+import csv
+import io
+import json
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_value(value):
+    """Datetimes as ISO 8601; everything else as stored"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def export_rows(cursor, fields: List[str], format: str) -> AsyncIterator[str]:
+    """
+    Lines of NDJSON or CSV for each document from the cursor.
+
+    Every row has exactly the given fields, in order; a field missing from
+    a document is null in NDJSON and empty in CSV.
+    """
+    if format == "csv":
+        yield ",".join(fields) + "\n"
+
+    async for document in cursor:
+        row = {field: export_value(document.get(field)) for field in fields}
+        if format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(row.values())
+            yield buffer.getvalue()
+        else:
+            yield json.dumps(row, default=str) + "\n"
+
+
+def export_response(cursor, fields: List[str], format: str, filename: str) -> StreamingResponse:
+    """Stream the cursor as a file download named filename.<format>"""
+    return StreamingResponse(
+        export_rows(cursor, fields, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
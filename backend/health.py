@@ -0,0 +1,146 @@
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+
+from indexes import REQUIRED_INDEXES, missing_indexes
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get("HEALTH_CHECK_INTERVAL_SECONDS", 5))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_CHECK_TIMEOUT_SECONDS", 2))
+# A result older than this many intervals means the checker itself is stuck
+HEALTH_STALE_INTERVALS = int(os.environ.get("HEALTH_STALE_INTERVALS", 3))
+
+
+class HealthChecker:
+    """
+    Refreshes dependency status in the background for the readiness probe.
+
+    Probes read the cached result instead of pinging MongoDB themselves, so
+    probe traffic adds no database load and a probe is answered without
+    waiting on I/O. The database gates readiness, and so do the unique
+    indexes in REQUIRED_INDEXES that duplicate detection depends on. If
+    setup_indexes is given (e.g. index creation that could not reach
+    MongoDB at boot), it is retried until it completes.
+
+    The payment provider is never called from here (every call costs an API
+    request); its entry reports whether a key is configured and how the
+    client's latest real provider call went. A provider outage should not
+    pull pods out of service, so it does not affect readiness.
+    """
+
+    def __init__(self, db, payment_client, interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+                 timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS, clock=time.monotonic,
+                 setup_indexes=None, required_indexes: dict = REQUIRED_INDEXES):
+        self.db = db
+        self.payment_client = payment_client
+        self.interval = interval
+        self.timeout = timeout
+        self.clock = clock
+        self.setup_indexes = setup_indexes
+        self.required_indexes = required_indexes
+        self.database = {"status": "unknown"}
+        self.indexes = {"status": "unknown"}
+        self.payments = {"status": "unknown"}
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop refreshing and report not ready from now on.
+
+        This runs in the lifespan shutdown, after uvicorn has stopped
+        accepting connections, so it does not drain traffic; the
+        orchestrator has to stop routing to the pod before signalling it.
+        """
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    async def _check_database(self) -> dict:
+        started = self.clock()
+        try:
+            await asyncio.wait_for(self.db.command("ping"), self.timeout)
+        except Exception as e:
+            logger.error("Readiness check: database ping failed: %s", e)
+            return {"status": "disconnected", "error": str(e) or type(e).__name__}
+        return {"status": "connected", "latency_ms": round((self.clock() - started) * 1000, 2)}
+
+    async def _check_indexes(self) -> dict:
+        # Indexes are not dropped at runtime; once present, stop looking
+        if self.indexes["status"] == "ready":
+            return self.indexes
+        if self.setup_indexes is not None and await self.setup_indexes():
+            self.setup_indexes = None
+        try:
+            missing = await asyncio.wait_for(missing_indexes(self.db, self.required_indexes), self.timeout)
+        except Exception as e:
+            logger.error("Readiness check: index lookup failed: %s", e)
+            return {"status": "unknown", "error": str(e) or type(e).__name__}
+        if missing:
+            return {"status": "missing", "missing": missing}
+        return {"status": "ready"}
+
+    def _check_payments(self) -> dict:
+        if self.payment_client is None:
+            return {"status": "unavailable"}
+        if not self.payment_client.configured:
+            return {"status": "not_configured"}
+        last_call = self.payment_client.last_call
+        if last_call is None:
+            return {"status": "configured"}
+        report = {"status": "reachable" if last_call["ok"] else "failing", "last_call_at": last_call["at"].isoformat()}
+        if not last_call["ok"]:
+            report["error"] = last_call["error"]
+        return report
+
+    async def refresh(self):
+        """Run one round of dependency checks and cache the result"""
+        self.database = await self._check_database()
+        if self.database["status"] == "connected":
+            self.indexes = await self._check_indexes()
+        self.payments = self._check_payments()
+        self.checked_at = datetime.utcnow()
+        self._checked_monotonic = self.clock()
+
+    @property
+    def stale(self) -> bool:
+        if self._checked_monotonic is None:
+            return True
+        return self.clock() - self._checked_monotonic > self.interval * HEALTH_STALE_INTERVALS
+
+    @property
+    def ready(self) -> bool:
+        return (
+            not self._stopping and not self.stale
+            and self.database["status"] == "connected" and self.indexes["status"] == "ready"
+        )
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "not_ready",
+            "service": "mindspace",
+            "database": self.database,
+            "indexes": self.indexes,
+            "payments": self.payments,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "stale": self.stale
+        }
@@ -0,0 +1,217 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# status_checks is kept bounded either by a TTL index (default) or, when
+# STATUS_CHECK_CAPPED_BYTES is set, as a capped collection. MongoDB does not
+# allow TTL indexes on capped collections, so the two modes are exclusive.
+STATUS_CHECK_TTL_SECONDS = int(os.environ.get("STATUS_CHECK_TTL_SECONDS", 60 * 60 * 24 * 7))
+STATUS_CHECK_CAPPED_BYTES = int(os.environ.get("STATUS_CHECK_CAPPED_BYTES", 0))
+
+# Processed webhook events are kept for a while for auditing, then expire
+PAYMENT_EVENT_RETENTION_SECONDS = int(os.environ.get("PAYMENT_EVENT_RETENTION_SECONDS", 60 * 60 * 24 * 30))
+
+# Cross-worker cache invalidations only matter for a few seconds
+CACHE_INVALIDATION_RETENTION_SECONDS = int(os.environ.get("CACHE_INVALIDATION_RETENTION_SECONDS", 60 * 60))
+
+# GET /api/status pages by (timestamp, id) in both modes. A TTL index must be
+# single-field, so in TTL mode it sits alongside the compound index.
+STATUS_CHECK_INDEXES = [IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id")]
+if not STATUS_CHECK_CAPPED_BYTES:
+    STATUS_CHECK_INDEXES.append(IndexModel(
+        [("timestamp", ASCENDING)],
+        name="timestamp_ttl",
+        expireAfterSeconds=STATUS_CHECK_TTL_SECONDS
+    ))
+
+# Indexes required by the routes, per collection. create_indexes is a no-op
+# for indexes that already exist with the same name and options.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "beta_signups": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "status_checks": STATUS_CHECK_INDEXES,
+    "reflections": [
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)], name="user_id_created_at"),
+    ],
+    "reflection_aggregates": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    # $merge targets need a unique index on their merge key
+    "analytics_weekly_signups": [
+        IndexModel([("week", ASCENDING)], name="week_unique", unique=True),
+    ],
+    "analytics_weekly_payments": [
+        IndexModel([("week", ASCENDING)], name="week_unique", unique=True),
+    ],
+    "analytics_beta_cohorts": [
+        IndexModel([("week", ASCENDING)], name="week_unique", unique=True),
+    ],
+    "analytics_beta_retention": [
+        IndexModel([("cohort_week", ASCENDING), ("activity_week", ASCENDING)], name="cohort_activity_unique", unique=True),
+    ],
+    "payment_events": [
+        IndexModel([("event_id", ASCENDING)], name="event_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("received_at", ASCENDING)], name="status_received_at"),
+        IndexModel([("claim_id", ASCENDING)], name="claim_id", sparse=True),
+        IndexModel([("processed_at", ASCENDING)], name="processed_at_ttl", expireAfterSeconds=PAYMENT_EVENT_RETENTION_SECONDS),
+    ],
+    # Shared rate-limit buckets expire once they would have refilled
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "cache_invalidations": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=CACHE_INVALIDATION_RETENTION_SECONDS),
+    ],
+}
+
+# Unique indexes the write paths rely on to reject duplicates (signup no
+# longer checks for an existing user first); readiness waits for them
+REQUIRED_INDEXES = {
+    "users": ["email_unique", "id_unique"],
+    "beta_signups": ["email_unique"],
+    "payment_transactions": ["session_id_unique"],
+    "payment_events": ["event_id_unique"],
+}
+
+# Query shapes issued by the routes, used to explain which plan MongoDB picks
+QUERY_SHAPES = [
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"id": "user-id"}, None),
+    ("beta_signups", {"email": "user@example.com"}, None),
+    ("beta_signups", {}, [("created_at", ASCENDING), ("id", ASCENDING)]),
+    ("payment_transactions", {"session_id": "cs_test"}, None),
+    ("status_checks", {}, [("timestamp", ASCENDING), ("id", ASCENDING)]),
+    ("payment_events", {"status": "pending"}, [("received_at", ASCENDING)]),
+    ("reflections", {"user_id": "user-id"}, [("created_at", ASCENDING)]),
+]
+
+
+async def ensure_status_checks_store(db):
+    """
+    Create status_checks as a capped collection when configured. Startup
+    only checks the collection's options; converting existing data is
+    migrate_status_checks(), run once with `manage.py migrate-status-checks`.
+    """
+    if not STATUS_CHECK_CAPPED_BYTES:
+        return
+
+    if "status_checks" not in await db.list_collection_names(filter={"name": "status_checks"}):
+        await db.create_collection("status_checks", capped=True, size=STATUS_CHECK_CAPPED_BYTES)
+    elif not (await db.status_checks.options()).get("capped"):
+        logger.warning(
+            "STATUS_CHECK_CAPPED_BYTES is set but status_checks is not capped; "
+            "run `python manage.py migrate-status-checks`"
+        )
+
+
+async def migrate_status_checks(db) -> dict:
+    """
+    One-off migration: convert legacy ISO-string timestamps to BSON dates
+    (TTL indexes ignore strings) and, when configured, convert the existing
+    collection to a capped one
+    """
+    result = await db.status_checks.update_many(
+        {"timestamp": {"$type": "string"}},
+        [{"$set": {"timestamp": {"$toDate": "$timestamp"}}}]
+    )
+    capped = False
+    if STATUS_CHECK_CAPPED_BYTES:
+        if "status_checks" not in await db.list_collection_names(filter={"name": "status_checks"}):
+            await db.create_collection("status_checks", capped=True, size=STATUS_CHECK_CAPPED_BYTES)
+            capped = True
+        elif not (await db.status_checks.options()).get("capped"):
+            await db.command("convertToCapped", "status_checks", size=STATUS_CHECK_CAPPED_BYTES)
+            capped = True
+    return {"timestamps_converted": result.modified_count, "converted_to_capped": capped}
+
+
+async def ensure_indexes(db) -> bool:
+    """
+    Create every index in INDEXES. Failures (e.g. duplicate data blocking a
+    unique index) are logged per collection so startup can continue. If
+    MongoDB is unreachable the rest are skipped; returns False so the
+    caller can try again once it is back.
+    """
+    try:
+        await ensure_status_checks_store(db)
+    except ConnectionFailure as e:
+        logger.error("Failed to prepare status_checks, MongoDB unreachable: %s", e)
+        return False
+    except PyMongoError as e:
+        logger.error("Failed to prepare status_checks: %s", e)
+
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except ConnectionFailure as e:
+            logger.error("Failed to create indexes on %s, MongoDB unreachable: %s", collection_name, e)
+            return False
+        except PyMongoError as e:
+            logger.error("Failed to create indexes on %s: %s", collection_name, e)
+    return True
+
+
+async def missing_indexes(db, required: dict = REQUIRED_INDEXES) -> dict:
+    """Names of the required indexes that do not exist, per collection"""
+    missing = {}
+    for collection_name, names in required.items():
+        existing = await db[collection_name].index_information()
+        absent = [name for name in names if name not in existing]
+        if absent:
+            missing[collection_name] = absent
+    return missing
+
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten a winning plan into its stage names, outermost first"""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def index_report(db) -> dict:
+    """
+    Report missing indexes and the winning plan for each route query shape
+    """
+    missing = {}
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        names = [index.document["name"] for index in indexes if index.document["name"] not in existing]
+        if names:
+            missing[collection_name] = names
+
+    plans = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        # Slot-based engine (MongoDB 7+) nests the classic plan under queryPlan
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+        plans.append({
+            "collection": collection_name,
+            "query": list(query.keys()),
+            "sort": [field for field, _ in sort] if sort else [],
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages
+        })
+
+    return {"missing": missing, "plans": plans}
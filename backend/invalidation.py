@@ -0,0 +1,114 @@
+"""
+Cross-worker cache invalidation
+
+Each worker keeps its own in-process caches (users, checkout status). When
+a write changes cached state, invalidate_everywhere() drops the entry
+locally and, with CACHE_INVALIDATION_ENABLED, records it in the
+cache_invalidations collection. Every worker runs an InvalidationListener
+that polls that collection and drops the same entries from its caches, so
+another worker serves a stale has_paid or quota for at most about one poll
+interval rather than the full cache TTL.
+"""
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from database import db
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION_ENABLED = os.environ.get("CACHE_INVALIDATION_ENABLED", "false").lower() == "true"
+CACHE_INVALIDATION_POLL_SECONDS = float(os.environ.get("CACHE_INVALIDATION_POLL_SECONDS", 1))
+# Re-read this far back on each poll, for inserts that become visible late
+# or were stamped by a worker whose clock runs slightly behind
+CACHE_INVALIDATION_OVERLAP = timedelta(seconds=5)
+CACHE_INVALIDATION_BATCH = 1000
+
+CACHES: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """Make a cache invalidatable by name from other workers"""
+    CACHES[name] = cache
+
+
+def invalidate_local(name: str, key: str):
+    cache = CACHES.get(name)
+    if cache is not None and key:
+        cache.invalidate(key)
+
+
+async def invalidate_everywhere(name: str, key: str):
+    """Drop a cache entry in this worker and, when enabled, in every worker"""
+    if not key:
+        return
+    invalidate_local(name, key)
+    if CACHE_INVALIDATION_ENABLED:
+        await db.cache_invalidations.insert_one({"cache": name, "key": key, "created_at": datetime.utcnow()})
+
+
+async def invalidate_many_everywhere(name: str, keys: List[str]):
+    """invalidate_everywhere for many keys, recorded with one insert"""
+    keys = [key for key in keys if key]
+    for key in keys:
+        invalidate_local(name, key)
+    if CACHE_INVALIDATION_ENABLED and keys:
+        now = datetime.utcnow()
+        await db.cache_invalidations.insert_many([{"cache": name, "key": key, "created_at": now} for key in keys])
+
+
+class InvalidationListener:
+    """Applies invalidations recorded by other workers to this worker's caches"""
+
+    def __init__(self, db, poll_interval: float = CACHE_INVALIDATION_POLL_SECONDS):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.applied = 0
+        self._since = datetime.utcnow()
+        self._seen: Dict[object, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error("Cache invalidation poll failed: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll_once(self) -> int:
+        """Apply invalidations not seen yet; returns how many were applied"""
+        window_start = self._since - CACHE_INVALIDATION_OVERLAP
+        cursor = self.db.cache_invalidations.find({"created_at": {"$gt": window_start}})
+        events = await cursor.sort("created_at", ASCENDING).to_list(CACHE_INVALIDATION_BATCH)
+
+        applied = 0
+        for event in events:
+            if event["_id"] in self._seen:
+                continue
+            self._seen[event["_id"]] = event["created_at"]
+            invalidate_local(event["cache"], event["key"])
+            applied += 1
+            self._since = max(self._since, event["created_at"])
+
+        # Forget events that have fallen out of the overlap window
+        horizon = self._since - CACHE_INVALIDATION_OVERLAP
+        self._seen = {event_id: created for event_id, created in self._seen.items() if created > horizon}
+        self.applied += applied
+        return applied
@@ -0,0 +1,22 @@
+"""
+Deferred imports for heavy modules
+
+lazy_import() returns a module whose body runs on first attribute access,
+so importing the app does not pay for dependencies (NumPy for scoring, for
+example) until a route actually uses them.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """Return module `name`, executing it on first attribute access"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,284 @@
+"""
+Structured, non-blocking logging
+
+configure_logging() puts a QueueHandler on the root logger: the event loop
+only samples, tags and enqueues records, while a QueueListener thread
+formats them (JSON by default, with email addresses redacted) and does the
+write. The queue is bounded, so a stalled disk drops records and counts
+them in log_records_dropped_total instead of blocking requests.
+
+RequestLogMiddleware gives each request an id (the X-Request-ID header, or
+a new one), which every record logged while handling it carries, and logs
+one access record per request with the route template and duration.
+
+UVICORN_LOG_CONFIG is the log_config for uvicorn.run(): it sends uvicorn's
+own loggers through the same queue instead of uvicorn's plain-text
+handlers, which write synchronously.
+
+Records at INFO and below are sampled: LOG_SAMPLE_RATE applies to every
+logger, and LOG_SAMPLE_RATES overrides it per logger, e.g.
+"access=0.1,routes.auth=0.5". Warnings and errors are always kept.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from metrics import registry, Counter
+from typing import Dict, Optional
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # json or text
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+LOG_REDACT_EMAILS = os.environ.get("LOG_REDACT_EMAILS", "true").lower() == "true"
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+EMAIL_PATTERN = re.compile(r"([A-Za-z0-9._%+-])[A-Za-z0-9._%+-]*@([A-Za-z0-9.-]+\.[A-Za-z]{2,})")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+LOG_RECORDS_DROPPED = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+))
+
+access_logger = logging.getLogger("access")
+
+
+def redact(text: str) -> str:
+    """Mask email addresses, keeping the first character and the domain"""
+    return EMAIL_PATTERN.sub(r"\1***@\2", text)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO-and-below records, per logger name"""
+
+    def __init__(self, default_rate: float = LOG_SAMPLE_RATE, rates: Optional[Dict[str, float]] = None, rng=random.random):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates if rates is not None else parse_sample_rates(LOG_SAMPLE_RATES)
+        self.rng = rng
+
+    def rate_for(self, name: str) -> float:
+        # The most specific configured logger wins, as with logger levels
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or self.rng() < rate
+
+
+class RequestIdFilter(logging.Filter):
+    """Tag records with the current request id, in the caller before queueing"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now, while they still hold the values being logged, but
+        # leave formatting and tracebacks to the listener thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and extras"""
+
+    def __init__(self, redact_emails: bool = LOG_REDACT_EMAILS):
+        super().__init__()
+        self.redact_emails = redact_emails
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        line = json.dumps(entry, default=str)
+        return redact(line) if self.redact_emails else line
+
+
+class RedactingFormatter(logging.Formatter):
+    def __init__(self, fmt: str = TEXT_FORMAT, redact_emails: bool = LOG_REDACT_EMAILS):
+        super().__init__(fmt)
+        self.redact_emails = redact_emails
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        return redact(line) if self.redact_emails else line
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """
+    Route the root logger through a bounded queue to a listener thread.
+
+    Idempotent; replaces any handlers already on the root logger. The
+    listener is stopped at exit, which flushes what is still queued.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else RedactingFormatter())
+
+    _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(SamplingFilter())
+    _handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _handler = None
+
+
+def queue_handler() -> logging.Handler:
+    """The root queue handler, as a logging.config handler factory"""
+    configure_logging()
+    return _handler
+
+
+# uvicorn applies this with dictConfig in each worker before importing the
+# app, so the queue is set up from the first record uvicorn logs
+UVICORN_LOG_CONFIG = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"queue": {"()": "logconfig.queue_handler"}},
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        name: {"handlers": [], "propagate": True}
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access")
+    },
+}
+
+
+def _request_id(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == REQUEST_ID_HEADER and value:
+            return value.decode("latin-1")[:MAX_REQUEST_ID_LENGTH]
+    return uuid.uuid4().hex
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware that sets the request id and logs one access record.
+
+    The id is echoed in the X-Request-ID response header, including on the
+    500 sent when the app raises. Access records carry method, route
+    template, status and duration_ms; 5xx responses are logged as warnings
+    so sampling never drops them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope)
+        token = request_id_var.set(request_id)
+        status = {"code": 500, "started": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["started"] = True
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # ServerErrorMiddleware sits outside this one and would send its
+            # 500 without the id; send it here, then let it log the error
+            if not status["started"]:
+                await send_wrapper({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", b"21")]
+                })
+                await send_wrapper({"type": "http.response.body", "body": b"Internal Server Error"})
+            raise
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            level = logging.WARNING if status["code"] >= 500 else logging.INFO
+            access_logger.log(
+                level, "%s %s %s", scope["method"], route, status["code"],
+                extra={"method": scope["method"], "route": route, "status": status["code"], "duration_ms": duration_ms}
+            )
+            request_id_var.reset(token)
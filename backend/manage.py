@@ -0,0 +1,216 @@
+"""
+MindSpace admin commands
+
+Usage:
+    python manage.py indexes                # report missing indexes and query plans
+    python manage.py indexes --create       # create missing indexes first
+    python manage.py migrate-status-checks  # one-off status_checks data migration
+    python manage.py analytics refresh      # incrementally refresh analytics rollups
+    python manage.py analytics export       # write rollups to columnar files
+    python manage.py serve                  # run the API with one worker per core
+    python manage.py beta import FILE       # bulk import beta signups from CSV/NDJSON
+    python manage.py beta promote           # flag every signed-up user as a beta tester
+"""
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+import database
+from database import db
+
+app = typer.Typer(help="MindSpace admin commands", no_args_is_help=True)
+
+
+@app.callback()
+def main():
+    """MindSpace admin commands"""
+
+
+def run(coro):
+    """Run a coroutine to completion and close the Mongo client"""
+    database.connect(timeout_ms=0)
+    try:
+        return asyncio.run(coro)
+    finally:
+        database.close()
+
+
+@app.command()
+def indexes(create: bool = typer.Option(False, "--create", help="Create missing indexes before reporting")):
+    """Report missing indexes and the explain plan for each route query shape"""
+    from indexes import ensure_indexes, index_report
+
+    async def _indexes():
+        if create:
+            await ensure_indexes(db)
+        return await index_report(db)
+
+    report = run(_indexes())
+
+    for collection_name, names in report["missing"].items():
+        typer.echo(f"MISSING {collection_name}: {', '.join(names)}")
+    for plan in report["plans"]:
+        marker = "COLLSCAN" if plan["collection_scan"] else "ok"
+        typer.echo(f"{marker:<8} {plan['collection']} {json.dumps(plan['query'])} sort={plan['sort']} -> {' > '.join(plan['stages'])}")
+
+    if report["missing"]:
+        raise typer.Exit(code=1)
+
+
+@app.command("migrate-status-checks")
+def migrate_status_checks():
+    """Convert legacy string timestamps in status_checks and cap it if configured"""
+    from indexes import migrate_status_checks as migrate
+
+    result = run(migrate(db))
+    typer.echo(f"Converted {result['timestamps_converted']} timestamp(s)")
+    if result["converted_to_capped"]:
+        typer.echo("status_checks is now capped")
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("0.0.0.0", "--host"),
+    port: int = typer.Option(8001, "--port"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Worker processes (default: WEB_CONCURRENCY or the CPU count)"),
+    graceful_timeout: int = typer.Option(30, "--graceful-timeout", help="Seconds to let in-flight requests finish on shutdown")
+):
+    """
+    Run the API with uvicorn worker processes.
+
+    Each worker opens its own clients in the app lifespan. With more than
+    one worker, state that must agree across workers is shared through
+    MongoDB unless overridden: cache invalidations are broadcast, rate-limit
+    buckets live in the rate_limits collection, and the bcrypt pool is split
+    so workers together use about one thread per core. Indexes are ensured
+    once here instead of by every worker.
+    """
+    import uvicorn
+    from indexes import ensure_indexes
+    from logconfig import UVICORN_LOG_CONFIG
+
+    cores = os.cpu_count() or 1
+    workers = workers or int(os.environ.get("WEB_CONCURRENCY", cores))
+    if workers > 1:
+        os.environ.setdefault("CACHE_INVALIDATION_ENABLED", "true")
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "mongo")
+        os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(1, cores // workers)))
+        if os.environ.get("MONGO_ENSURE_INDEXES", "true").lower() == "true":
+            # If MongoDB is unreachable now, each worker retries instead
+            if run(ensure_indexes(db)):
+                os.environ["MONGO_ENSURE_INDEXES"] = "false"
+
+    typer.echo(f"Starting {workers} worker(s) on {host}:{port}")
+    uvicorn.run(
+        "server:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=graceful_timeout,
+        # Rewrites the peer address from trusted proxies, which is what the
+        # rate limiter's per-IP bucket keys on by default
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        # The app writes its own structured access records, and uvicorn's
+        # other logs go through the same queue as the app's
+        access_log=False,
+        log_config=UVICORN_LOG_CONFIG
+    )
+
+
+analytics_app = typer.Typer(help="Cohort analytics rollups", no_args_is_help=True)
+app.add_typer(analytics_app, name="analytics")
+
+
+@analytics_app.command("refresh")
+def analytics_refresh(
+    rollup: Optional[List[str]] = typer.Option(None, "--rollup", help="Rollup to refresh (default: all)"),
+    full: bool = typer.Option(False, "--full", help="Recompute from the beginning instead of the high-water mark")
+):
+    """Recompute rollups inside MongoDB and merge them into analytics_* collections"""
+    from analytics import ROLLUPS, refresh_rollup
+
+    async def _refresh():
+        return [await refresh_rollup(db, name, full=full) for name in (rollup or ROLLUPS)]
+
+    for result in run(_refresh()):
+        typer.echo(f"{result['rollup']:<16} since={result['since']} high_water={result['high_water']}")
+
+
+@analytics_app.command("export")
+def analytics_export(
+    out_dir: Path = typer.Option(Path("analytics_out"), "--out-dir", help="Directory for output files"),
+    file_format: str = typer.Option("parquet", "--format", help="parquet or csv"),
+    rollup: Optional[List[str]] = typer.Option(None, "--rollup", help="Rollup to export (default: all)")
+):
+    """Stream materialized rollups into columnar files"""
+    from analytics import ROLLUPS, export_rollup
+
+    async def _export():
+        return [await export_rollup(db, name, out_dir, file_format) for name in (rollup or ROLLUPS)]
+
+    for path in run(_export()):
+        typer.echo(f"wrote {path}")
+
+
+beta_app = typer.Typer(help="Bulk beta signup and tester management", no_args_is_help=True)
+app.add_typer(beta_app, name="beta")
+
+
+def echo_batches(reports) -> dict:
+    """Print one line per batch report and return the totals"""
+    from bulk_import import summarize, UNSUMMED_FIELDS
+
+    async def _collect():
+        seen = []
+        started = time.perf_counter()
+        async for report in reports:
+            seen.append(report)
+            counts = " ".join(f"{field}={report[field]}" for field in report if field not in UNSUMMED_FIELDS)
+            typer.echo(f"batch {report['batch']:>5} {counts} {report['rows_per_second']} rows/s")
+            for error in report.get("errors", []):
+                typer.echo(f"  invalid {error['email']!r}: {error['error']}")
+        return summarize(seen, time.perf_counter() - started)
+
+    return _collect()
+
+
+@beta_app.command("import")
+def beta_import(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV or NDJSON file of emails"),
+    file_format: Optional[str] = typer.Option(None, "--format", help="csv or ndjson (default: from the file extension)"),
+    promote: bool = typer.Option(False, "--promote", help="Also flag matching users as beta testers"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", help="Rows per bulk write (default: IMPORT_BATCH_SIZE)")
+):
+    """Upsert beta signups in unordered batches, reporting throughput per batch"""
+    from bulk_import import aiter_lines, import_signups, IMPORT_BATCH_SIZE
+
+    file_format = file_format or ("ndjson" if path.suffix in (".ndjson", ".jsonl") else "csv")
+
+    async def _import():
+        with path.open(encoding="utf-8-sig", newline="") as lines:
+            reports = import_signups(db, aiter_lines(lines), file_format, promote=promote, batch_size=batch_size or IMPORT_BATCH_SIZE)
+            return await echo_batches(reports)
+
+    totals = run(_import())
+    typer.echo(json.dumps(totals))
+
+
+@beta_app.command("promote")
+def beta_promote(
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", help="Users per update (default: IMPORT_BATCH_SIZE)")
+):
+    """Flag every user with a beta signup as a beta tester"""
+    from bulk_import import promote_beta_testers, IMPORT_BATCH_SIZE
+
+    totals = run(echo_batches(promote_beta_testers(db, batch_size=batch_size or IMPORT_BATCH_SIZE)))
+    typer.echo(json.dumps(totals))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+# Mirrors of the provider SDK's checkout models, so routes and the stub
+# provider do not import the SDK; PaymentClient converts at the boundary.
+class CheckoutSessionRequest(BaseModel):
+    amount: float
+    currency: str = "usd"
+    success_url: str
+    cancel_url: str
+    metadata: Optional[Dict[str, str]] = None
+
+
+class CheckoutSessionResponse(BaseModel):
+    url: str
+    session_id: str
+
+
+class CheckoutStatusResponse(BaseModel):
+    status: str
+    payment_status: str
+    amount_total: int
+    currency: str
+    metadata: Optional[Dict[str, str]] = None
+
+
+class WebhookResponse(BaseModel):
+    event_type: str
+    event_id: str
+    session_id: str
+    payment_status: str
+    metadata: Optional[Dict[str, str]] = None
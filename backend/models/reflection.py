@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field, conint
+from typing import List, Dict, Optional
+from datetime import datetime
+import uuid
+
+
+class Reflection(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    answers: bytes  # one byte per question, 0-3
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ReflectionCreate(BaseModel):
+    answers: List[conint(ge=0, le=3)] = Field(min_length=10, max_length=10)
+
+
+class ReflectionBatchCreate(BaseModel):
+    reflections: List[ReflectionCreate] = Field(min_length=1, max_length=100)
+
+
+class ReflectionResult(BaseModel):
+    id: str
+    total_score: int
+    band: str
+    title: str
+    message: str
+    created_at: datetime
+
+
+class ReflectionTrend(BaseModel):
+    count: int
+    totals: List[int]
+    moving_average: List[float]
+    question_means: List[float]
+    band_counts: Dict[str, int]
+
+
+class ReflectionSummary(BaseModel):
+    count: int
+    question_means: List[float]
+    question_stddev: List[float]
+    recent_totals: List[int]
+    recent_average: float
+    band_counts: Dict[str, int]
+    last_reflection_at: Optional[datetime] = None
@@ -0,0 +1,35 @@
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Tuple
+import base64
+import json
+
+
+def encode_cursor(timestamp: datetime, doc_id: str) -> str:
+    """Encode the sort key of the last returned document as an opaque cursor"""
+    raw = json.dumps([timestamp.isoformat(), doc_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor, raising 400 if malformed"""
+    try:
+        timestamp, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), doc_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, cursor: str, descending: bool = False) -> dict:
+    """
+    Filter matching documents strictly after the cursor position when sorted
+    by (field, id)
+    """
+    timestamp, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {
+        "$or": [
+            {field: {op: timestamp}},
+            {field: timestamp, "id": {op: doc_id}}
+        ]
+    }
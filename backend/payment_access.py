@@ -0,0 +1,42 @@
+from pymongo import ReturnDocument
+from invalidation import invalidate_everywhere
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def unlock_user_access(db, session_id: str, user_id: str, email: str = None) -> bool:
+    """
+    Mark a checkout session paid and unlock its user.
+
+    Both writes are conditional, so racing callers (status poll and webhook)
+    cannot apply the same payment twice: the transaction update matches only
+    while it is not yet paid and the user update only while has_paid is
+    still False. The user update runs even when the transaction was already
+    paid, so a caller that died between the two writes is repaired by the
+    next one. Returns True if this call unlocked the user.
+    """
+    transaction = await db.payment_transactions.find_one_and_update(
+        {"session_id": session_id, "payment_status": {"$ne": "paid"}},
+        {"$set": {"payment_status": "paid", "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "user_id": 1, "email": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if transaction is not None:
+        user_id = transaction.get("user_id", user_id)
+        email = transaction.get("email", email)
+    if not user_id:
+        return False
+
+    result = await db.users.update_one(
+        {"id": user_id, "has_paid": False},
+        {"$set": {"has_paid": True}}
+    )
+    if result.modified_count == 0:
+        return False
+
+    await invalidate_everywhere("users", email)
+    await invalidate_everywhere("checkout_status", session_id)
+    logger.info("User %s unlocked full access via payment", email)
+    return True
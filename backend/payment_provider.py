@@ -0,0 +1,158 @@
+from datetime import datetime
+from fastapi import Request
+from cache import TTLCache
+from models.payment import CheckoutSessionResponse, CheckoutStatusResponse, WebhookResponse
+from typing import Optional, Dict
+import asyncio
+import json
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_PROVIDER = os.environ.get("PAYMENT_PROVIDER", "stripe")  # stripe or stub
+PAYMENT_TIMEOUT_SECONDS = float(os.environ.get("PAYMENT_TIMEOUT_SECONDS", 10))
+
+
+class PaymentClient:
+    """
+    Long-lived payment provider client shared by every request.
+
+    StripeCheckout instances are cached per webhook URL (bounded, since the
+    URL is derived from the request host) and every provider call is
+    wrapped in a timeout so a slow provider cannot hold a request forever.
+    The provider SDK is imported on the first call, not at startup, and
+    its responses are converted to the models in models.payment.
+
+    Outbound HTTP connections belong to the SDK. StripeCheckout takes no
+    HTTP client or session, and the only hook below it is the stripe
+    module's process-wide default client, so this class does no connection
+    pooling of its own.
+
+    The outcome of the latest provider round trip (creating or fetching a
+    checkout session) is kept in last_call for the health report. Webhook
+    handling does not count: a bad signature says nothing about the
+    provider.
+    """
+
+    def __init__(self, api_key: Optional[str], timeout: float = PAYMENT_TIMEOUT_SECONDS):
+        self.api_key = api_key
+        self.timeout = timeout
+        self._checkouts = TTLCache(maxsize=16, ttl=60 * 60 * 24)
+        self.last_call: Optional[dict] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _checkout(self, webhook_url: str):
+        checkout = self._checkouts.get(webhook_url)
+        if checkout is None:
+            from emergentintegrations.payments.stripe.checkout import StripeCheckout
+            checkout = StripeCheckout(api_key=self.api_key, webhook_url=webhook_url)
+            self._checkouts.set(webhook_url, checkout)
+        return checkout
+
+    async def _round_trip(self, call):
+        """Await a provider call under the timeout, recording how it went"""
+        try:
+            result = await asyncio.wait_for(call, self.timeout)
+        except Exception as e:
+            self.last_call = {"ok": False, "at": datetime.utcnow(), "error": str(e) or type(e).__name__}
+            raise
+        self.last_call = {"ok": True, "at": datetime.utcnow()}
+        return result
+
+    async def create_checkout_session(self, checkout_request, webhook_url: str = ""):
+        from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest
+
+        provider_request = CheckoutSessionRequest(**checkout_request.model_dump(exclude_none=True))
+        session = await self._round_trip(self._checkout(webhook_url).create_checkout_session(provider_request))
+        return CheckoutSessionResponse.model_validate(session, from_attributes=True)
+
+    async def get_checkout_status(self, session_id: str):
+        status = await self._round_trip(self._checkout("").get_checkout_status(session_id))
+        return CheckoutStatusResponse.model_validate(status, from_attributes=True)
+
+    async def handle_webhook(self, body: bytes, signature: str, webhook_url: str = ""):
+        event = await asyncio.wait_for(
+            self._checkout(webhook_url).handle_webhook(body, signature),
+            self.timeout
+        )
+        return WebhookResponse.model_validate(event, from_attributes=True)
+
+    async def close(self):
+        self._checkouts.clear()
+
+
+class StubPaymentClient:
+    """
+    Local stand-in for the payment provider, used by tests and benchmarks.
+
+    Sessions are kept in memory and reported as paid once created; webhook
+    bodies are treated as JSON with session_id and payment_status keys and
+    the signature is not checked. An optional latency simulates the
+    provider round trip.
+    """
+
+    configured = True
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sessions: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {}
+        self.last_call: Optional[dict] = None
+
+    async def _call(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if name != "handle_webhook":
+            self.last_call = {"ok": True, "at": datetime.utcnow()}
+
+    async def create_checkout_session(self, checkout_request, webhook_url: str = ""):
+        await self._call("create_checkout_session")
+        session_id = f"cs_stub_{uuid.uuid4().hex}"
+        self.sessions[session_id] = {
+            "amount_total": int(round(checkout_request.amount * 100)),
+            "currency": checkout_request.currency,
+            "metadata": dict(checkout_request.metadata or {}),
+            "payment_status": "paid"
+        }
+        return CheckoutSessionResponse(url=f"https://checkout.stub.local/{session_id}", session_id=session_id)
+
+    async def get_checkout_status(self, session_id: str):
+        await self._call("get_checkout_status")
+        session = self.sessions.get(session_id, {
+            "amount_total": 0, "currency": "usd", "metadata": {}, "payment_status": "unpaid"
+        })
+        return CheckoutStatusResponse(status="complete" if session["payment_status"] == "paid" else "open", **session)
+
+    async def handle_webhook(self, body: bytes, signature: str, webhook_url: str = ""):
+        await self._call("handle_webhook")
+        event = json.loads(body or b"{}")
+        session = self.sessions.get(event.get("session_id"), {})
+        return WebhookResponse(
+            event_type=event.get("event_type", "checkout.session.completed"),
+            event_id=event.get("event_id", f"evt_stub_{uuid.uuid4().hex}"),
+            session_id=event.get("session_id", ""),
+            payment_status=event.get("payment_status", session.get("payment_status", "paid")),
+            metadata=event.get("metadata", session.get("metadata", {}))
+        )
+
+    async def close(self):
+        self.sessions.clear()
+
+
+def create_payment_client():
+    """Build the payment client selected by PAYMENT_PROVIDER"""
+    if PAYMENT_PROVIDER == "stub":
+        logger.info("Using stub payment provider")
+        return StubPaymentClient(latency=float(os.environ.get("PAYMENT_STUB_LATENCY_SECONDS", 0)))
+    return PaymentClient(api_key=os.environ.get("STRIPE_API_KEY"))
+
+
+def get_payment_client(request: Request):
+    """Dependency returning the app-wide payment client"""
+    return request.app.state.payment_client
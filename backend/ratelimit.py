@@ -0,0 +1,257 @@
+"""
+Rate limiting for the credential and signup endpoints
+
+Token buckets are kept per client IP and per submitted email, so a
+credential-stuffing run is throttled whether it rotates accounts or
+addresses. Buckets live in a BucketStore: MemoryBucketStore for a single
+worker, MongoBucketStore to share limits across workers (it also runs
+against a mongomock-motor stand-in locally). The middleware rejects with
+429 before the request reaches routing, so throttled attempts cost no
+bcrypt or database work beyond the bucket update itself.
+
+RATE_LIMIT_IP_SOURCE says where the client IP for the per-IP bucket comes
+from. "peer" (the default) uses the connection's address, which is the
+client when it connects directly or when uvicorn's proxy_headers has
+rewritten it from a trusted proxy (manage.py serve sets FORWARDED_ALLOW_IPS).
+"forwarded" walks X-Forwarded-For from the right, skipping
+RATE_LIMIT_TRUSTED_PROXIES, to the first untrusted hop. Behind an ingress
+that neither covers, the peer is the proxy and every user shares its
+bucket; "none" turns the per-IP bucket off.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from metrics import registry, Counter
+from typing import Optional, Tuple
+import ipaddress
+import json
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # memory or mongo
+RATE_LIMIT_IP_SOURCE = os.environ.get("RATE_LIMIT_IP_SOURCE", "peer")  # peer, forwarded or none
+# Comma-separated addresses or CIDR ranges of the proxies in front of the app
+RATE_LIMIT_TRUSTED_PROXIES = os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "")
+RATE_LIMIT_MEMORY_KEYS = int(os.environ.get("RATE_LIMIT_MEMORY_KEYS", 100000))
+
+# (capacity, refill per minute): a burst of `capacity`, then a steady rate
+RATE_LIMIT_IP = (
+    int(os.environ.get("RATE_LIMIT_IP_CAPACITY", 20)),
+    float(os.environ.get("RATE_LIMIT_IP_PER_MINUTE", 10))
+)
+RATE_LIMIT_EMAIL = (
+    int(os.environ.get("RATE_LIMIT_EMAIL_CAPACITY", 5)),
+    float(os.environ.get("RATE_LIMIT_EMAIL_PER_MINUTE", 2))
+)
+
+# Rate-limited POST paths and the bucket kinds each one takes from
+RATE_LIMITED_PATHS = {
+    "/api/auth/login": ("ip", "email"),
+    "/api/auth/signup": ("ip", "email"),
+    "/api/beta-signup": ("ip", "email"),
+}
+RATE_LIMITS = {"ip": RATE_LIMIT_IP, "email": RATE_LIMIT_EMAIL}
+
+# Larger bodies are not parsed for an email; they are still IP-limited
+MAX_INSPECTED_BODY_BYTES = 16 * 1024
+
+RATE_LIMITED = registry.register(Counter(
+    "http_requests_rate_limited_total", "Requests rejected by the rate limiter", ("route", "bucket")
+))
+
+
+class MemoryBucketStore:
+    """Token buckets in process memory, least recently used evicted first"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MEMORY_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: int, per_minute: float, cost: float = 1) -> Tuple[bool, float]:
+        """Take `cost` tokens; returns (allowed, seconds until enough tokens)"""
+        now = self.clock()
+        rate = per_minute / 60
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class MongoBucketStore:
+    """
+    Token buckets shared by every worker through a MongoDB collection.
+
+    Each take is one find_one_and_update with an update pipeline: refill,
+    check and decrement happen atomically on the server, so concurrent
+    workers cannot overspend a bucket. Times come from the calling worker's
+    clock; negative elapsed time from clock skew counts as zero. Idle
+    buckets expire through the TTL index on expires_at.
+    """
+
+    def __init__(self, db, collection: str = "rate_limits", clock=datetime.utcnow):
+        self.db = db
+        self.collection = collection
+        self.clock = clock
+
+    async def take(self, key: str, capacity: int, per_minute: float, cost: float = 1) -> Tuple[bool, float]:
+        now = self.clock()
+        rate = per_minute / 60
+        elapsed_seconds = {"$divide": [
+            {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]},
+            1000
+        ]}
+        bucket = await self.db[self.collection].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [capacity, {"$add": [
+                        {"$ifNull": ["$tokens", capacity]},
+                        {"$multiply": [elapsed_seconds, rate]}
+                    ]}]},
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=capacity / rate)
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (cost - bucket["tokens"]) / rate
+
+
+def create_bucket_store():
+    """Build the bucket store selected by RATE_LIMIT_BACKEND"""
+    if RATE_LIMIT_BACKEND == "mongo":
+        from database import db
+        return MongoBucketStore(db)
+    return MemoryBucketStore()
+
+
+def request_email(body: bytes) -> Optional[str]:
+    """Normalized email from a JSON request body, if there is one"""
+    if not body or len(body) > MAX_INSPECTED_BODY_BYTES:
+        return None
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+def parse_networks(spec: str) -> list:
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip()]
+
+
+def _is_trusted(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(scope, source: str, trusted_proxies) -> Optional[str]:
+    """The client IP to rate-limit on, or None to skip the IP bucket"""
+    peer = scope["client"][0] if scope.get("client") else None
+    if source == "none" or not peer:
+        return None
+    if source == "peer" or not _is_trusted(peer, trusted_proxies):
+        return peer
+
+    forwarded = []
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            forwarded.extend(value.decode("latin-1").split(","))
+    for address in reversed(forwarded):
+        address = address.strip()
+        if address and not _is_trusted(address, trusted_proxies):
+            return address
+    # Only trusted hops: the request did not come from outside
+    return None
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying RATE_LIMITED_PATHS.
+
+    The body of a limited request is read up front to find the email, then
+    replayed to the app unchanged. If the bucket store fails the request is
+    let through, so a store outage does not take logins down with it.
+    """
+
+    def __init__(self, app, store=None, ip_source: str = RATE_LIMIT_IP_SOURCE, trusted_proxies: str = RATE_LIMIT_TRUSTED_PROXIES):
+        if ip_source not in ("none", "peer", "forwarded"):
+            raise ValueError(f"Unknown RATE_LIMIT_IP_SOURCE: {ip_source}")
+        if ip_source == "forwarded" and not trusted_proxies:
+            raise ValueError("RATE_LIMIT_IP_SOURCE=forwarded needs RATE_LIMIT_TRUSTED_PROXIES")
+        self.app = app
+        self.store = store
+        self.enabled = RATE_LIMIT_ENABLED
+        self.ip_source = ip_source
+        self.trusted_proxies = parse_networks(trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        kinds = RATE_LIMITED_PATHS.get(scope["path"]) if scope["type"] == "http" else None
+        if not self.enabled or not kinds or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        if self.store is None:
+            self.store = create_bucket_store()
+
+        body, more_body, messages = b"", True, []
+        while more_body and len(body) <= MAX_INSPECTED_BODY_BYTES:
+            message = await receive()
+            messages.append(message)
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        keys = {"ip": client_ip(scope, self.ip_source, self.trusted_proxies), "email": request_email(body)}
+        for kind in kinds:
+            if not keys[kind]:
+                continue
+            capacity, per_minute = RATE_LIMITS[kind]
+            try:
+                allowed, retry_after = await self.store.take(f"{kind}:{scope['path']}:{keys[kind]}", capacity, per_minute)
+            except Exception as e:
+                logger.error("Rate limit store error: %s", e)
+                break
+            if not allowed:
+                RATE_LIMITED.inc((scope["path"], kind))
+                await self._reject(send, retry_after)
+                return
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    async def _reject(self, send, retry_after: float):
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": b'{"detail":"Too many requests, please try again later"}'})
@@ -0,0 +1,55 @@
+"""
+JSON responses
+
+FAST_JSON=true makes orjson the app's default response class. Hot routes
+that build their output from projected Mongo documents return
+json_response() directly, which skips the response_model validation and
+jsonable_encoder passes; response_model is kept on those routes for the
+OpenAPI schema.
+"""
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from datetime import datetime
+from typing import Optional
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON = os.environ.get("FAST_JSON", "false").lower() == "true"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON is set but orjson is not installed; using the standard JSON response")
+
+DefaultJSONResponse = ORJSONResponse if FAST_JSON and orjson is not None else JSONResponse
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DocumentJSONResponse(JSONResponse):
+    """Standard-library JSON that also writes datetimes, as orjson does"""
+
+    def render(self, content) -> bytes:
+        return json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+            default=_encode_default
+        ).encode("utf-8")
+
+
+def json_response(content, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """Serialize content as-is, with orjson when FAST_JSON is enabled"""
+    response_class = ORJSONResponse if DefaultJSONResponse is ORJSONResponse else DocumentJSONResponse
+    return response_class(content, status_code=status_code, headers=headers)
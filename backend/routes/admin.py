@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from pymongo import ASCENDING
+from database import db, read_db
+from exports import export_response
+from routes.beta import SIGNUP_PROJECTION, SIGNUP_SORT
+from bulk_import import iter_lines, import_signups, promote_beta_testers, summarize, IMPORT_BATCH_SIZE
+import hmac
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+ADMIN_API_KEY = os.environ.get("ADMIN_API_KEY")
+
+USER_EXPORT_PROJECTION = {
+    "_id": 0, "id": 1, "email": 1, "created_at": 1,
+    "has_paid": 1, "is_beta_tester": 1, "free_reflections_used": 1
+}
+USER_EXPORT_FIELDS = ["id", "email", "created_at", "has_paid", "is_beta_tester", "free_reflections_used"]
+SIGNUP_EXPORT_FIELDS = ["id", "email", "created_at", "status"]
+EXPORT_BATCH_SIZE = 1000
+
+
+async def require_admin(x_admin_key: str = Header(None)):
+    """Dependency that checks the X-Admin-Key header against ADMIN_API_KEY"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    # Compare bytes: compare_digest rejects str with non-ASCII characters
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+async def _run_batches(reports, job: str) -> dict:
+    """Collect batch reports, logging each, and add the totals"""
+    started = time.perf_counter()
+    batches = []
+    async for report in reports:
+        batches.append(report)
+        logger.info("%s batch %s: %s rows, %s rows/s", job, report['batch'], report['rows'], report['rows_per_second'])
+    return {"success": True, "batches": batches, "summary": summarize(batches, time.perf_counter() - started)}
+
+
+@router.post("/beta-signups/import")
+async def import_beta_signups(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    promote: bool = False,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000)
+):
+    """
+    Import beta signups from a CSV or NDJSON request body
+
+    The body is consumed as it arrives and written batch by batch, so it is
+    never held in memory whole. The response lists each batch (rows, valid,
+    invalid, inserted, promoted, rows_per_second) and the totals. With
+    promote, users with an imported email are flagged as beta testers.
+    """
+    try:
+        reports = import_signups(db, iter_lines(request.stream()), format, promote=promote, batch_size=batch_size)
+        return await _run_batches(reports, "Beta signup import")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error importing beta signups: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="Error importing signups"
+        )
+
+
+@router.post("/beta-testers/promote")
+async def promote_all_beta_testers(batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000)):
+    """
+    Flag every user with a beta signup as a beta tester
+    """
+    try:
+        return await _run_batches(promote_beta_testers(db, batch_size=batch_size), "Beta tester promotion")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error promoting beta testers: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="Error promoting beta testers"
+        )
+
+
+@router.get("/users/export")
+async def export_users(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Stream every user as NDJSON or CSV, without password hashes
+    """
+    cursor = read_db.users.find({}, USER_EXPORT_PROJECTION).sort("created_at", ASCENDING).batch_size(EXPORT_BATCH_SIZE)
+    return export_response(cursor, USER_EXPORT_FIELDS, format, "users")
+
+
+@router.get("/beta-signups/export")
+async def export_beta_signups(format: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """
+    Stream every beta signup as NDJSON or CSV
+
+    Rows are read from the cursor in fixed-size batches, so memory use does
+    not grow with the number of signups.
+    """
+    cursor = read_db.beta_signups.find({}, SIGNUP_PROJECTION).sort(SIGNUP_SORT).batch_size(EXPORT_BATCH_SIZE)
+    return export_response(cursor, SIGNUP_EXPORT_FIELDS, format, "beta_signups")
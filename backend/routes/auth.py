@@ -1,13 +1,62 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from pymongo.errors import DuplicateKeyError
 from models.user import UserCreate, UserLogin, User, UserResponse, Token
-from auth import get_password_hash, verify_password, create_access_token, decode_access_token
+from auth import (
+    get_password_hash_async,
+    verify_password_async,
+    create_access_token,
+    decode_access_token,
+    PasswordHasherBusy,
+)
 from database import db
+from cache import TTLCache
+from responses import json_response
+from invalidation import register_cache
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Hydrated users keyed by token subject (email). Routes that modify a user
+# invalidate its entry; the TTL bounds staleness for any other writer.
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 30))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+register_cache("users", user_cache)
+
+
+# Public user fields, served straight from projected documents on hot routes
+USER_RESPONSE_FIELDS = tuple(UserResponse.model_fields)
+USER_FIELD_DEFAULTS = {"has_paid": False, "is_beta_tester": False, "free_reflections_used": 0}
+LOGIN_PROJECTION = {"_id": 0, "hashed_password": 1, **{field: 1 for field in USER_RESPONSE_FIELDS}}
+
+
+def user_response(user) -> dict:
+    """Public view of a user document or cached User"""
+    if isinstance(user, dict):
+        return {field: user.get(field, USER_FIELD_DEFAULTS.get(field)) for field in USER_RESPONSE_FIELDS}
+    return {field: getattr(user, field) for field in USER_RESPONSE_FIELDS}
+
+
+def token_response(user) -> Response:
+    """Token payload for signup and login, serialized without model round trips"""
+    return json_response({
+        "access_token": create_access_token(data={"sub": user["email"]}),
+        "token_type": "bearer",
+        "user": user_response(user)
+    })
+
+
+def invalidate_cached_user(email: str):
+    """
+    Drop a user from this worker's auth cache. Writes that change a user
+    use invalidation.invalidate_everywhere so other workers drop it too.
+    """
+    if email:
+        user_cache.invalidate(email)
+
 
 async def get_current_user(authorization: str = Header(None)) -> User:
     """Dependency to get current authenticated user"""
@@ -24,24 +73,25 @@ async def get_current_user(authorization: str = Header(None)) -> User:
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    
     user_dict = await db.users.find_one({"email": email}, {"_id": 0})
     if not user_dict:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return User(**user_dict)
+    user = User(**user_dict)
+    user_cache.set(email, user)
+    return user
 
 
 @router.post("/signup", response_model=Token)
 async def signup(user_data: UserCreate):
     """Register a new user"""
     try:
-        # Check if user already exists
-        existing_user = await db.users.find_one({"email": user_data.email})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         user = User(
             email=user_data.email,
             hashed_password=hashed_password,
@@ -50,27 +100,24 @@ async def signup(user_data: UserCreate):
             free_reflections_used=0
         )
         
-        await db.users.insert_one(user.dict())
-        
-        # Create access token
-        access_token = create_access_token(data={"sub": user.email})
+        user_doc = user.dict()
         
-        user_response = UserResponse(
-            id=user.id,
-            email=user.email,
-            has_paid=user.has_paid,
-            is_beta_tester=user.is_beta_tester,
-            free_reflections_used=user.free_reflections_used
-        )
+        # Single atomic write: the unique email index rejects duplicates
+        try:
+            await db.users.insert_one(user_doc)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="Email already registered")
         
-        logger.info(f"New user registered: {user.email}")
+        logger.info("New user registered: %s", user.email)
         
-        return Token(access_token=access_token, user=user_response)
+        return token_response(user_doc)
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Error during signup: {str(e)}")
+        logger.error("Error during signup: %s", e)
         raise HTTPException(status_code=500, detail="Registration failed")
 
 
@@ -78,49 +125,40 @@ async def signup(user_data: UserCreate):
 async def login(credentials: UserLogin):
     """Login existing user"""
     try:
-        # Find user
-        user_dict = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+        # Find user, reading only what the response and password check need
+        user_dict = await db.users.find_one({"email": credentials.email}, LOGIN_PROJECTION)
         if not user_dict:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        user = User(**user_dict)
-        
         # Verify password
-        if not verify_password(credentials.password, user.hashed_password):
+        if not await verify_password_async(credentials.password, user_dict["hashed_password"]):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        # Create access token
-        access_token = create_access_token(data={"sub": user.email})
+        logger.info("User logged in: %s", user_dict['email'])
         
-        user_response = UserResponse(
-            id=user.id,
-            email=user.email,
-            has_paid=user.has_paid,
-            is_beta_tester=user.is_beta_tester,
-            free_reflections_used=user.free_reflections_used
-        )
-        
-        logger.info(f"User logged in: {user.email}")
-        
-        return Token(access_token=access_token, user=user_response)
+        return token_response(user_dict)
         
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"Error during login: {str(e)}")
+        logger.error("Error during login: %s", e)
         raise HTTPException(status_code=500, detail="Login failed")
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        has_paid=current_user.has_paid,
-        is_beta_tester=current_user.is_beta_tester,
-        free_reflections_used=current_user.free_reflections_used
-    )
+    return json_response(user_response(current_user))
+
+
+BETA_ACCESS = {
+    "has_access": True,
+    "reason": "beta_period",
+    "free_reflections_remaining": "unlimited",
+    "message": "Free unlimited access during beta testing!"
+}
 
 
 @router.get("/access-check")
@@ -129,12 +167,7 @@ async def check_access(current_user: User = Depends(get_current_user)):
     
     # BETA MODE: Everyone gets unlimited free access during beta testing (Weeks 4-6)
     # TODO: Re-enable payment requirement after beta (Week 7+)
-    return {
-        "has_access": True,
-        "reason": "beta_period",
-        "free_reflections_remaining": "unlimited",
-        "message": "Free unlimited access during beta testing!"
-    }
+    return json_response(BETA_ACCESS)
     
     # Original payment logic (commented out for beta):
     # # Beta testers get free access
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
 from models.beta_signup import BetaSignup, BetaSignupCreate, BetaSignupResponse
-from database import db
+from database import db, read_db
+from pagination import encode_cursor, keyset_filter
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SIGNUP_PROJECTION = {"_id": 0, "id": 1, "email": 1, "created_at": 1, "status": 1}
+SIGNUP_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
 
 @router.post("/beta-signup", response_model=BetaSignupResponse)
 async def create_beta_signup(signup_data: BetaSignupCreate):
@@ -14,21 +21,18 @@ async def create_beta_signup(signup_data: BetaSignupCreate):
     Store beta signup email in database
     """
     try:
-        # Check if email already exists
-        existing_signup = await db.beta_signups.find_one({"email": signup_data.email})
-        
-        if existing_signup:
+        # Create new signup; the unique email index rejects duplicates
+        signup = BetaSignup(email=signup_data.email)
+        try:
+            await db.beta_signups.insert_one(signup.dict())
+        except DuplicateKeyError:
             return BetaSignupResponse(
                 success=True,
                 message="You're already on the list! We'll be in touch soon.",
                 email=signup_data.email
             )
         
-        # Create new signup
-        signup = BetaSignup(email=signup_data.email)
-        await db.beta_signups.insert_one(signup.dict())
-        
-        logger.info(f"New beta signup: {signup_data.email}")
+        logger.info("New beta signup: %s", signup_data.email)
         
         return BetaSignupResponse(
             success=True,
@@ -37,7 +41,7 @@ async def create_beta_signup(signup_data: BetaSignupCreate):
         )
         
     except Exception as e:
-        logger.error(f"Error creating beta signup: {str(e)}")
+        logger.error("Error creating beta signup: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Something went wrong. Please try again."
@@ -45,26 +49,36 @@ async def create_beta_signup(signup_data: BetaSignupCreate):
 
 
 @router.get("/beta-signups")
-async def get_beta_signups():
+async def get_beta_signups(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
     """
-    Get all beta signups (for admin purposes)
+    Get beta signups one page at a time (for admin purposes)
+    
+    Pages are ordered by (created_at, id). Pass the returned next_cursor to
+    fetch the following page; it is null on the last page.
     """
     try:
-        signups = await db.beta_signups.find().to_list(1000)
+        query = keyset_filter("created_at", cursor) if cursor else {}
+        signups_cursor = read_db.beta_signups.find(query, SIGNUP_PROJECTION).sort(SIGNUP_SORT).limit(limit)
+        signups = await signups_cursor.to_list(limit)
+        
+        next_cursor = None
+        if len(signups) == limit:
+            last = signups[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        
         return {
             "success": True,
             "count": len(signups),
-            "signups": [
-                {
-                    "email": signup["email"],
-                    "created_at": signup["created_at"],
-                    "status": signup["status"]
-                }
-                for signup in signups
-            ]
+            "signups": signups,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching beta signups: {str(e)}")
+        logger.error("Error fetching beta signups: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Error fetching signups"
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
-from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 from models.user import User, PaymentTransaction
+from models.payment import CheckoutSessionRequest, CheckoutSessionResponse, CheckoutStatusResponse
 from routes.auth import get_current_user
+from routes.admin import require_admin
+from payment_provider import get_payment_client
+from webhook_worker import enqueue_webhook_event
+from payment_access import unlock_user_access
 from database import db
+from cache import TTLCache, SingleFlight
+from invalidation import register_cache
 from datetime import datetime
+import asyncio
 import os
 import logging
 
@@ -20,13 +27,27 @@ PAYMENT_PACKAGES = {
     }
 }
 
+# Transaction states that never change again, mapped to the provider's
+# session status reported for them
+TERMINAL_SESSION_STATUS = {
+    "paid": "complete",
+    "expired": "expired"
+}
+
+# Frontend polls checkout-status after redirect; keep each answer briefly
+CHECKOUT_STATUS_TTL_SECONDS = float(os.environ.get("CHECKOUT_STATUS_TTL_SECONDS", 3))
+checkout_status_cache = TTLCache(maxsize=10000, ttl=CHECKOUT_STATUS_TTL_SECONDS)
+register_cache("checkout_status", checkout_status_cache)
+checkout_status_flight = SingleFlight()
+
 
 @router.post("/create-checkout", response_model=CheckoutSessionResponse)
 async def create_checkout_session(
     request: Request,
     package_id: str,
     origin_url: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    payment_client=Depends(get_payment_client)
 ):
     """
     Create Stripe checkout session for $1 payment
@@ -45,17 +66,13 @@ async def create_checkout_session(
         amount = package["amount"]
         currency = package["currency"]
         
-        # Initialize Stripe
-        api_key = os.environ.get("STRIPE_API_KEY")
-        if not api_key:
+        if not payment_client.configured:
             raise HTTPException(status_code=500, detail="Payment system not configured")
         
         # Build webhook URL
         host_url = str(request.base_url).rstrip('/')
         webhook_url = f"{host_url}/api/webhook/stripe"
         
-        stripe_checkout = StripeCheckout(api_key=api_key, webhook_url=webhook_url)
-        
         # Build success and cancel URLs from frontend origin
         success_url = f"{origin_url}/payment-success?session_id={{CHECKOUT_SESSION_ID}}"
         cancel_url = f"{origin_url}/payment-cancel"
@@ -74,7 +91,7 @@ async def create_checkout_session(
             }
         )
         
-        session = await stripe_checkout.create_checkout_session(checkout_request)
+        session = await payment_client.create_checkout_session(checkout_request, webhook_url)
         
         # Create payment transaction record BEFORE redirect
         transaction = PaymentTransaction(
@@ -89,78 +106,121 @@ async def create_checkout_session(
         
         await db.payment_transactions.insert_one(transaction.dict())
         
-        logger.info(f"Checkout session created for user {current_user.email}: {session.session_id}")
+        logger.info("Checkout session created for user %s: %s", current_user.email, session.session_id)
         
         return session
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        logger.error("Payment provider timed out creating checkout session")
+        raise HTTPException(status_code=504, detail="Payment provider timed out")
     except Exception as e:
-        logger.error(f"Error creating checkout session: {str(e)}")
+        logger.error("Error creating checkout session: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create payment session")
 
 
+def _status_from_transaction(transaction: dict) -> CheckoutStatusResponse:
+    """Rebuild a provider status response from a settled transaction"""
+    payment_status = transaction["payment_status"]
+    return CheckoutStatusResponse(
+        status=TERMINAL_SESSION_STATUS[payment_status],
+        payment_status=payment_status,
+        amount_total=int(round(transaction["amount"] * 100)),
+        currency=transaction["currency"],
+        metadata=transaction.get("metadata") or {}
+    )
+
+
+async def _refresh_checkout_status(session_id: str, payment_client):
+    """
+    Resolve a session's status, contacting the provider only while the
+    local transaction is still pending, and sync the result to the database
+    """
+    # Find transaction in database
+    transaction = await db.payment_transactions.find_one(
+        {"session_id": session_id},
+        {"_id": 0}
+    )
+    
+    if not transaction:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    
+    # Settled sessions never change again; answer from the local record
+    if transaction["payment_status"] in TERMINAL_SESSION_STATUS:
+        return _status_from_transaction(transaction)
+    
+    # Get status from Stripe
+    status_response = await payment_client.get_checkout_status(session_id)
+    
+    payment_status = status_response.payment_status
+    if status_response.status == "expired" and payment_status != "paid":
+        payment_status = "expired"
+    
+    if payment_status == "paid":
+        # If payment successful, unlock user access
+        await unlock_user_access(db, session_id, transaction["user_id"], transaction["email"])
+    elif transaction["payment_status"] != payment_status:
+        # Update transaction status if changed
+        await db.payment_transactions.update_one(
+            {"session_id": session_id},
+            {
+                "$set": {
+                    "payment_status": payment_status,
+                    "updated_at": datetime.utcnow()
+                }
+            }
+        )
+    
+    # Answer with what was stored, so this poll and later ones (served from
+    # the record) agree
+    if status_response.payment_status != payment_status:
+        status_response = status_response.model_copy(update={"payment_status": payment_status})
+    return status_response
+
+
 @router.get("/checkout-status/{session_id}", response_model=CheckoutStatusResponse)
 async def get_checkout_status(
     session_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    payment_client=Depends(get_payment_client)
 ):
     """
     Check payment status and update database
+    
+    Results are cached for a few seconds and concurrent polls for the same
+    session share a single provider call.
     """
     try:
-        # Initialize Stripe
-        api_key = os.environ.get("STRIPE_API_KEY")
-        stripe_checkout = StripeCheckout(api_key=api_key, webhook_url="")
+        status_response = checkout_status_cache.get(session_id)
+        if status_response is not None:
+            return status_response
         
-        # Get status from Stripe
-        status_response = await stripe_checkout.get_checkout_status(session_id)
-        
-        # Find transaction in database
-        transaction = await db.payment_transactions.find_one(
-            {"session_id": session_id},
-            {"_id": 0}
+        status_response = await checkout_status_flight.do(
+            session_id,
+            lambda: _refresh_checkout_status(session_id, payment_client)
         )
-        
-        if not transaction:
-            raise HTTPException(status_code=404, detail="Transaction not found")
-        
-        # Update transaction status if changed
-        if transaction["payment_status"] != status_response.payment_status:
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {
-                    "$set": {
-                        "payment_status": status_response.payment_status,
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
-            
-            # If payment successful, unlock user access
-            if status_response.payment_status == "paid":
-                # Check if we haven't already processed this payment
-                user = await db.users.find_one({"id": transaction["user_id"]})
-                if user and not user.get("has_paid"):
-                    await db.users.update_one(
-                        {"id": transaction["user_id"]},
-                        {"$set": {"has_paid": True}}
-                    )
-                    logger.info(f"User {transaction['email']} unlocked full access via payment")
+        checkout_status_cache.set(session_id, status_response)
         
         return status_response
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        logger.error("Payment provider timed out checking payment status")
+        raise HTTPException(status_code=504, detail="Payment provider timed out")
     except Exception as e:
-        logger.error(f"Error checking payment status: {str(e)}")
+        logger.error("Error checking payment status: %s", e)
         raise HTTPException(status_code=500, detail="Failed to check payment status")
 
 
 @router.post("/webhook/stripe")
-async def stripe_webhook(request: Request):
+async def stripe_webhook(request: Request, payment_client=Depends(get_payment_client)):
     """
     Handle Stripe webhook events
+    
+    The event is verified and stored in the payment_events inbox, keyed by
+    event ID, then acknowledged immediately. Redelivered events are ignored.
     """
     try:
         # Get raw body and signature
@@ -170,42 +230,28 @@ async def stripe_webhook(request: Request):
         if not signature:
             raise HTTPException(status_code=400, detail="No signature provided")
         
-        # Initialize Stripe
-        api_key = os.environ.get("STRIPE_API_KEY")
+        # Handle webhook
         webhook_url = str(request.base_url).rstrip('/') + "/api/webhook/stripe"
-        stripe_checkout = StripeCheckout(api_key=api_key, webhook_url=webhook_url)
+        webhook_response = await payment_client.handle_webhook(body, signature, webhook_url)
         
-        # Handle webhook
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        # Process payment completion
-        if webhook_response.payment_status == "paid":
-            session_id = webhook_response.session_id
-            metadata = webhook_response.metadata
-            
-            # Update transaction
-            await db.payment_transactions.update_one(
-                {"session_id": session_id},
-                {
-                    "$set": {
-                        "payment_status": "paid",
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
-            
-            # Unlock user access
-            if metadata and "user_id" in metadata:
-                user = await db.users.find_one({"id": metadata["user_id"]})
-                if user and not user.get("has_paid"):
-                    await db.users.update_one(
-                        {"id": metadata["user_id"]},
-                        {"$set": {"has_paid": True}}
-                    )
-                    logger.info(f"Webhook: User {metadata.get('email')} unlocked via payment")
+        # Queue the event; the webhook worker applies it in the background
+        if await enqueue_webhook_event(db, webhook_response):
+            worker = getattr(request.app.state, "webhook_worker", None)
+            if worker is not None:
+                worker.notify()
         
         return {"status": "success"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Webhook error: {str(e)}")
+        logger.error("Webhook error: %s", e)
         raise HTTPException(status_code=400, detail="Webhook processing failed")
+
+
+@router.get("/webhook/queue-stats", dependencies=[Depends(require_admin)])
+async def get_webhook_queue_stats(request: Request):
+    """
+    Webhook inbox depth and processing lag (X-Admin-Key header)
+    """
+    return await request.app.state.webhook_worker.stats()
@@ -1,40 +1,241 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from bson import Binary
 from models.user import User
-from routes.auth import get_current_user
-from database import db
+from models.reflection import (
+    Reflection,
+    ReflectionCreate,
+    ReflectionBatchCreate,
+    ReflectionResult,
+    ReflectionTrend,
+    ReflectionSummary,
+)
+from routes.auth import get_current_user, invalidate_cached_user
+from invalidation import invalidate_everywhere
+from database import db, get_client
 from datetime import datetime
+from typing import List
+from lazy import lazy_import
 import logging
+import os
+
+# NumPy loads with the first reflection scored, not at app startup
+scoring = lazy_import("scoring")
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Number of reflections a free user may complete before paying
+FREE_REFLECTION_LIMIT = int(os.environ.get("FREE_REFLECTION_LIMIT", 1))
+
+# How many recent totals each user's aggregate keeps for the dashboard
+REFLECTION_RECENT_LIMIT = int(os.environ.get("REFLECTION_RECENT_LIMIT", 20))
+
+# Wrap the reflection insert and aggregate update in a multi-document
+# transaction. Requires a replica set, so it is opt-in.
+MONGO_TRANSACTIONS = os.environ.get("MONGO_TRANSACTIONS", "false").lower() == "true"
+
 
 @router.post("/increment-free-usage")
 async def increment_free_usage(current_user: User = Depends(get_current_user)):
     """
     Increment the free reflections used counter for free users
+    
+    The quota check and the increment are one conditional update, so
+    concurrent requests cannot push the counter past FREE_REFLECTION_LIMIT
+    and the returned count is the stored post-update value.
     """
     try:
-        # Only increment for free users (not paid, not beta)
+        # Only increment for free users (not paid, not beta). These flags only
+        # ever flip to True, so a cached True is safe to trust.
         if current_user.has_paid or current_user.is_beta_tester:
             return {"success": True, "message": "User has unlimited access"}
         
-        # Increment counter
-        result = await db.users.update_one(
-            {"id": current_user.id},
-            {"$inc": {"free_reflections_used": 1}}
+        # Increment counter while under the limit
+        user = await db.users.find_one_and_update(
+            {
+                "id": current_user.id,
+                "has_paid": False,
+                "is_beta_tester": False,
+                "free_reflections_used": {"$lt": FREE_REFLECTION_LIMIT}
+            },
+            {"$inc": {"free_reflections_used": 1}},
+            projection={"_id": 0, "free_reflections_used": 1},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count > 0:
-            logger.info(f"Incremented free usage for user {current_user.email}")
+        if user:
+            await invalidate_everywhere("users", current_user.email)
+            logger.info("Incremented free usage for user %s", current_user.email)
             return {
                 "success": True,
-                "free_reflections_used": current_user.free_reflections_used + 1
+                "free_reflections_used": user["free_reflections_used"],
+                "free_reflections_remaining": FREE_REFLECTION_LIMIT - user["free_reflections_used"]
             }
-        else:
-            return {"success": False, "message": "Failed to update counter"}
+        
+        # No match: either the quota is used up or the user was unlocked
+        # since the cached snapshot was taken
+        invalidate_cached_user(current_user.email)
+        user = await db.users.find_one(
+            {"id": current_user.id},
+            {"_id": 0, "has_paid": 1, "is_beta_tester": 1, "free_reflections_used": 1}
+        )
+        if user and (user.get("has_paid") or user.get("is_beta_tester")):
+            return {"success": True, "message": "User has unlimited access"}
+        
+        return {
+            "success": False,
+            "message": "Free reflection limit reached",
+            "free_reflections_used": user["free_reflections_used"] if user else None,
+            "free_reflections_remaining": 0
+        }
             
     except Exception as e:
-        logger.error(f"Error incrementing free usage: {str(e)}")
+        logger.error("Error incrementing free usage: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update usage")
+
+
+def _results(reflections: List[dict]) -> List[ReflectionResult]:
+    """Score stored reflections in one vectorized pass"""
+    answers = scoring.unpack_answers([r["answers"] for r in reflections])
+    totals = scoring.score_totals(answers)
+    bands = scoring.score_bands(totals)
+    return [
+        ReflectionResult(
+            id=reflection["id"],
+            total_score=int(total),
+            created_at=reflection["created_at"],
+            **scoring.BANDS[band]
+        )
+        for reflection, total, band in zip(reflections, totals, bands)
+    ]
+
+
+async def _store_reflections(user: User, submissions: List[ReflectionCreate]) -> List[ReflectionResult]:
+    reflections = [
+        Reflection(user_id=user.id, answers=scoring.pack_answers(submission.answers))
+        for submission in submissions
+    ]
+    docs = [reflection.model_dump() for reflection in reflections]
+    for doc in docs:
+        doc["answers"] = Binary(doc["answers"])
+    
+    # Fold the new answers into the per-user aggregate in one update
+    answers = scoring.unpack_answers([reflection.answers for reflection in reflections])
+    aggregate_update = scoring.aggregate_update(answers, REFLECTION_RECENT_LIMIT)
+    aggregate_update["$set"] = {"last_reflection_at": reflections[-1].created_at}
+    
+    async def write(session=None):
+        await db.reflections.insert_many(docs, ordered=False, session=session)
+        await db.reflection_aggregates.update_one(
+            {"user_id": user.id},
+            aggregate_update,
+            upsert=True,
+            session=session
+        )
+    
+    if MONGO_TRANSACTIONS:
+        async with await get_client().start_session() as session:
+            async with session.start_transaction():
+                await write(session)
+    else:
+        await write()
+    
+    return _results([reflection.model_dump() for reflection in reflections])
+
+
+@router.get("/questions")
+async def get_questions():
+    """
+    Reflection questions and score bands
+    """
+    return {
+        "questions": scoring.REFLECTION_QUESTIONS,
+        "max_answer": scoring.MAX_ANSWER,
+        "bands": [
+            {"min_score": int(threshold), **band}
+            for threshold, band in zip(scoring.BAND_THRESHOLDS, scoring.BANDS)
+        ]
+    }
+
+
+@router.post("", response_model=ReflectionResult)
+async def create_reflection(
+    submission: ReflectionCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Store a reflection and return its server-side score
+    """
+    try:
+        results = await _store_reflections(current_user, [submission])
+        return results[0]
+    except Exception as e:
+        logger.error("Error saving reflection: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to save reflection")
+
+
+@router.post("/batch", response_model=List[ReflectionResult])
+async def create_reflections_batch(
+    batch: ReflectionBatchCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Store several reflections at once (e.g. synced from an offline device)
+    """
+    try:
+        return await _store_reflections(current_user, batch.reflections)
+    except Exception as e:
+        logger.error("Error saving reflections: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to save reflections")
+
+
+@router.get("/history", response_model=List[ReflectionResult])
+async def get_reflection_history(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Most recent reflections with their scores, newest first
+    """
+    try:
+        cursor = db.reflections.find({"user_id": current_user.id}, {"_id": 0, "user_id": 0})
+        reflections = await cursor.sort("created_at", DESCENDING).limit(limit).to_list(limit)
+        return _results(reflections)
+    except Exception as e:
+        logger.error("Error fetching reflection history: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to fetch reflections")
+
+
+@router.get("/summary", response_model=ReflectionSummary)
+async def get_reflection_summary(current_user: User = Depends(get_current_user)):
+    """
+    Dashboard summary from the user's precomputed aggregate: a single keyed
+    read regardless of how many reflections they have
+    """
+    try:
+        aggregate = await db.reflection_aggregates.find_one({"user_id": current_user.id}, {"_id": 0})
+        return scoring.summarize_aggregate(aggregate or {})
+    except Exception as e:
+        logger.error("Error fetching reflection summary: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to fetch summary")
+
+
+@router.get("/trend", response_model=ReflectionTrend)
+async def get_reflection_trend(
+    window: int = Query(5, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Totals, moving average, per-question means and band counts over the
+    user's whole history, oldest first
+    """
+    try:
+        cursor = db.reflections.find({"user_id": current_user.id}, {"_id": 0, "answers": 1})
+        reflections = await cursor.sort("created_at", ASCENDING).to_list(None)
+        answers = scoring.unpack_answers([r["answers"] for r in reflections])
+        return scoring.summarize(answers, window)
+    except Exception as e:
+        logger.error("Error computing reflection trend: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to compute trend")
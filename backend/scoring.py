@@ -0,0 +1,137 @@
+"""
+Reflection scoring
+
+Answers are stored as 10-byte vectors (one 0-3 answer per question) and
+scored in bulk with NumPy: a user's whole history is loaded into one
+(n, 10) uint8 matrix and every total, band and trend is computed with array
+operations rather than a Python loop per submission.
+"""
+import numpy as np
+from typing import Iterable, List
+
+REFLECTION_QUESTIONS = [
+    "I feel tense even when nothing specific is wrong.",
+    "I overthink situations after they happen.",
+    "I worry about worst-case outcomes.",
+    "I notice physical tension during stress.",
+    "I avoid situations that feel uncertain.",
+    "I replay conversations in my head.",
+    "I struggle to relax fully.",
+    "I feel on edge in social situations.",
+    "I prepare excessively for possible problems.",
+    "I feel relief only after a stressful event ends."
+]
+
+QUESTION_COUNT = len(REFLECTION_QUESTIONS)
+MAX_ANSWER = 3
+
+# Lower bound of each band's total score, in band order
+BAND_THRESHOLDS = np.array([0, 10, 20])
+BANDS = [
+    {
+        "band": "lower",
+        "title": "Lower Activation Patterns",
+        "message": "Your responses suggest lower activation patterns. You may experience stress situationally rather than consistently."
+    },
+    {
+        "band": "moderate",
+        "title": "Moderate Nervous System Activation",
+        "message": "Your responses suggest moderate nervous system activation under stress. Awareness can help you intervene earlier."
+    },
+    {
+        "band": "frequent",
+        "title": "Frequent Activation Patterns",
+        "message": "Your responses suggest frequent activation patterns. Your nervous system may remain on alert more often than needed."
+    }
+]
+
+
+def pack_answers(answers: Iterable[int]) -> bytes:
+    """Encode one submission as a 10-byte vector"""
+    return bytes(answers)
+
+
+def unpack_answers(vectors: List[bytes]) -> np.ndarray:
+    """Decode stored answer vectors into an (n, 10) uint8 matrix"""
+    if not vectors:
+        return np.empty((0, QUESTION_COUNT), dtype=np.uint8)
+    return np.frombuffer(b"".join(vectors), dtype=np.uint8).reshape(-1, QUESTION_COUNT)
+
+
+def score_totals(answers: np.ndarray) -> np.ndarray:
+    """Total score per submission"""
+    return answers.sum(axis=1, dtype=np.int32)
+
+
+def score_bands(totals: np.ndarray) -> np.ndarray:
+    """Band index per total score"""
+    return np.searchsorted(BAND_THRESHOLDS, totals, side="right") - 1
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average; the first window-1 points average what exists"""
+    sums = np.cumsum(values, dtype=np.float64)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, values.size + 1), window)
+    return sums / counts
+
+
+def summarize(answers: np.ndarray, window: int = 5) -> dict:
+    """Trend summary over a user's whole history, oldest submission first"""
+    totals = score_totals(answers)
+    bands = score_bands(totals)
+    return {
+        "count": int(totals.size),
+        "totals": totals.tolist(),
+        "moving_average": np.round(moving_average(totals, window), 2).tolist(),
+        "question_means": np.round(answers.mean(axis=0), 3).tolist() if totals.size else [0.0] * QUESTION_COUNT,
+        "band_counts": {
+            band["band"]: int(count)
+            for band, count in zip(BANDS, np.bincount(bands, minlength=len(BANDS)))
+        }
+    }
+
+
+def aggregate_update(answers: np.ndarray, recent_limit: int) -> dict:
+    """
+    MongoDB update that folds a batch of submissions (oldest first) into a
+    user's running aggregate. Per-question sums are kept in sub-documents
+    keyed by question index so $inc also works on the upsert that creates
+    the aggregate.
+    """
+    values = answers.astype(np.int64)
+    totals = score_totals(answers)
+    band_counts = np.bincount(score_bands(totals), minlength=len(BANDS))
+
+    increments = {"count": int(totals.size)}
+    for question, (total, squares) in enumerate(zip(values.sum(axis=0), (values ** 2).sum(axis=0))):
+        increments[f"question_sums.{question}"] = int(total)
+        increments[f"question_sumsq.{question}"] = int(squares)
+    for band, count in zip(BANDS, band_counts):
+        if count:
+            increments[f"band_counts.{band['band']}"] = int(count)
+
+    return {
+        "$inc": increments,
+        "$push": {"recent_totals": {"$each": totals.tolist(), "$slice": -recent_limit}}
+    }
+
+
+def summarize_aggregate(aggregate: dict) -> dict:
+    """Dashboard summary from a stored aggregate, without touching history"""
+    count = aggregate.get("count", 0)
+    keys = [str(question) for question in range(QUESTION_COUNT)]
+    sums = np.array([aggregate.get("question_sums", {}).get(key, 0) for key in keys], dtype=np.float64)
+    sumsq = np.array([aggregate.get("question_sumsq", {}).get(key, 0) for key in keys], dtype=np.float64)
+    means = sums / count if count else np.zeros(QUESTION_COUNT)
+    variances = np.maximum(sumsq / count - means ** 2, 0) if count else np.zeros(QUESTION_COUNT)
+    recent = aggregate.get("recent_totals", [])
+    return {
+        "count": count,
+        "question_means": np.round(means, 3).tolist(),
+        "question_stddev": np.round(np.sqrt(variances), 3).tolist(),
+        "recent_totals": recent,
+        "recent_average": round(float(np.mean(recent)), 2) if recent else 0.0,
+        "band_counts": {band["band"]: aggregate.get("band_counts", {}).get(band["band"], 0) for band in BANDS},
+        "last_reflection_at": aggregate.get("last_reflection_at")
+    }
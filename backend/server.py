@@ -1,25 +1,76 @@
-from fastapi import FastAPI, APIRouter
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, Depends, Query, Request
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+from functools import partial
 from starlette.middleware.cors import CORSMiddleware
 import os
 import logging
-from pathlib import Path
+import env  # noqa: F401
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime, timezone
 from routes.beta import router as beta_router
 from routes.auth import router as auth_router
 from routes.payments import router as payments_router
 from routes.reflections import router as reflections_router
-from database import db, client
-
+from routes.admin import router as admin_router, require_admin
+import database
+from database import db, read_db, pool_stats
+from auth import password_hasher, token_cache
+from routes.auth import user_cache
+from routes.payments import checkout_status_cache
+from indexes import ensure_indexes
+from payment_provider import create_payment_client
+from webhook_worker import WebhookWorker
+from health import HealthChecker
+from metrics import registry, MetricsMiddleware, CONTENT_TYPE
+from responses import DefaultJSONResponse, json_response
+from ratelimit import RateLimitMiddleware
+from logconfig import configure_logging, RequestLogMiddleware
+from invalidation import InvalidationListener, CACHE_INVALIDATION_ENABLED
+from pagination import encode_cursor, keyset_filter
+from pymongo import ASCENDING
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # JSON through a queue (see logconfig.py); here rather than at import,
+    # so importing server from tests and tools leaves logging alone
+    configure_logging()
+    # Clients are created here rather than at import time
+    database.connect()
+    # Index creation failing (even with MongoDB down) does not stop startup;
+    # the health checker retries it and holds readiness until it is done
+    setup_indexes = None
+    if os.environ.get('MONGO_ENSURE_INDEXES', 'true').lower() == 'true':
+        if not await ensure_indexes(db):
+            setup_indexes = partial(ensure_indexes, db)
+    app.state.payment_client = create_payment_client()
+    app.state.webhook_worker = WebhookWorker(db)
+    app.state.webhook_worker.start()
+    app.state.health = HealthChecker(db, app.state.payment_client, setup_indexes=setup_indexes)
+    app.state.health.start()
+    app.state.invalidation_listener = None
+    if CACHE_INVALIDATION_ENABLED:
+        app.state.invalidation_listener = InvalidationListener(db)
+        app.state.invalidation_listener.start()
+    
+    yield
+    
+    # Uvicorn has stopped accepting and drained in-flight requests by now;
+    # finish the current webhook batch before closing the clients it uses
+    await app.state.health.stop()
+    await app.state.webhook_worker.stop()
+    if app.state.invalidation_listener is not None:
+        await app.state.invalidation_listener.stop()
+    await app.state.payment_client.close()
+    database.close()
+    password_hasher.shutdown()
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env', override=False)
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -36,55 +87,106 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+STATUS_CHECK_SORT = [("timestamp", ASCENDING), ("id", ASCENDING)]
+STATUS_CHECK_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "MindSpace API is running"}
 
-# Health check endpoint for Kubernetes
+# Health check endpoints for Kubernetes
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Liveness probe: the process is up and serving; no I/O
+    """
+    return {"status": "alive", "service": "mindspace"}
+
+@app.get("/health/ready")
+async def readiness_check(request: Request):
+    """
+    Readiness probe: serves the background checker's cached result,
+    503 while the database is unreachable or the result is stale
+    """
+    health = request.app.state.health
+    return json_response(health.report(), status_code=200 if health.ready else 503)
+
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """
-    Health check endpoint for Kubernetes liveness/readiness probes
+    Kept for existing probe configurations; same as /health/ready
     """
-    try:
-        # Simple ping to verify MongoDB connection
-        await db.command('ping')
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "service": "mindspace"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+    return await readiness_check(request)
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text exposition of request, MongoDB and bcrypt pool metrics
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+@api_router.get("/cache-stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """
+    Hit/miss counters for the in-process caches (X-Admin-Key header)
+    """
+    return {
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "checkout_status": checkout_status_cache.stats()
+    }
+
+@api_router.get("/db-stats", dependencies=[Depends(require_admin)])
+async def get_db_stats():
+    """
+    MongoDB connection pool statistics (X-Admin-Key header)
+    """
+    return pool_stats.stats()
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
+    # Timestamp is stored as a native BSON date so the TTL index can expire it
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
     
     _ = await db.status_checks.insert_one(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+async def get_status_checks(
+    limit: int = Query(100, ge=1, le=1000),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None
+):
+    """
+    List status checks oldest first, optionally only those at or after
+    `since`. When more rows remain, the X-Next-Cursor header holds the
+    cursor for the next page.
+    """
+    query = {}
+    if since:
+        query["timestamp"] = {"$gte": since}
+    if cursor:
+        query.update(keyset_filter("timestamp", cursor))
+    
+    # Project exactly the StatusCheck fields, so documents serialize as-is
+    status_cursor = read_db.status_checks.find(query, STATUS_CHECK_PROJECTION).sort(STATUS_CHECK_SORT).limit(limit)
+    status_checks = await status_cursor.to_list(limit)
+    for status_check in status_checks:
+        # BSON dates are UTC but come back naive; mark them so clients do
+        # not read the ISO string as local time
+        if status_check["timestamp"].tzinfo is None:
+            status_check["timestamp"] = status_check["timestamp"].replace(tzinfo=timezone.utc)
     
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    headers = {}
+    if len(status_checks) == limit:
+        last = status_checks[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["timestamp"], last["id"])
     
-    return status_checks
+    return json_response(status_checks, headers=headers)
 
 # Include beta routes
 api_router.include_router(beta_router, tags=["Beta Signups"])
@@ -98,9 +200,15 @@ api_router.include_router(payments_router, prefix="/payments", tags=["Payments"]
 # Include reflection routes
 api_router.include_router(reflections_router, prefix="/reflections", tags=["Reflections"])
 
+# Include admin routes (X-Admin-Key header)
+api_router.include_router(admin_router, prefix="/admin", tags=["Admin"])
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside CORS, so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -109,13 +217,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Outside the other middleware, so request metrics include their time
+app.add_middleware(MetricsMiddleware)
+
+# Outermost, so every log record written while handling a request has its id
+app.add_middleware(RequestLogMiddleware)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+logger = logging.getLogger(__name__)
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Make backend modules importable and load settings before auth.py reads them
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+load_dotenv(BACKEND_DIR / '.env', override=False)
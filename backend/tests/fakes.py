@@ -0,0 +1,157 @@
+"""
+In-memory stand-ins for Motor collections that count database round trips
+"""
+import asyncio
+import contextlib
+import copy
+
+from pymongo.errors import DuplicateKeyError
+
+
+def matches_value(actual, condition):
+    if isinstance(condition, dict):
+        if "$ne" in condition:
+            return actual != condition["$ne"]
+        if "$in" in condition:
+            return actual in condition["$in"]
+        if "$lt" in condition:
+            return actual is not None and actual < condition["$lt"]
+    return actual == condition
+
+
+def matches(document, query):
+    return all(matches_value(document.get(field), value) for field, value in query.items())
+
+
+class FakeResult:
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None, inserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.inserted_id = inserted_id
+
+
+class FakeCollection:
+    """Equality-match collection with optional unique fields and op counters"""
+
+    def __init__(self, unique=()):
+        self.unique = unique
+        self.documents = []
+        self.ops = {}
+
+    def _count(self, op):
+        self.ops[op] = self.ops.get(op, 0) + 1
+
+    @property
+    def round_trips(self):
+        return sum(self.ops.values())
+
+    async def insert_one(self, document):
+        self._count("insert_one")
+        await asyncio.sleep(0)
+        for field in self.unique:
+            if any(existing.get(field) == document.get(field) for existing in self.documents):
+                raise DuplicateKeyError(f"E11000 duplicate key error: {field}")
+        self.documents.append(copy.deepcopy(document))
+        return FakeResult(inserted_id=document.get("id"))
+
+    async def find_one(self, query, projection=None):
+        self._count("find_one")
+        await asyncio.sleep(0)
+        for document in self.documents:
+            if matches(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    def _apply(self, document, update):
+        for field, value in update.get("$set", {}).items():
+            document[field] = value
+        for field, value in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + value
+
+    async def update_one(self, query, update, upsert=False):
+        self._count("update_one")
+        await asyncio.sleep(0)
+        for document in self.documents:
+            if matches(document, query):
+                before = copy.deepcopy(document)
+                self._apply(document, update)
+                return FakeResult(matched_count=1, modified_count=int(before != document))
+        return FakeResult()
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=False, upsert=False):
+        self._count("find_one_and_update")
+        await asyncio.sleep(0)
+        for document in self.documents:
+            if matches(document, query):
+                before = copy.deepcopy(document)
+                self._apply(document, update)
+                return copy.deepcopy(document) if return_document else before
+        return None
+
+
+class FakeDatabase:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class FakeSession:
+    """Client session that records the transactions committed through it"""
+
+    def __init__(self):
+        self.in_transaction = False
+        self.committed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @contextlib.asynccontextmanager
+    async def start_transaction(self):
+        self.in_transaction = True
+        yield
+        self.in_transaction = False
+        self.committed += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.session = FakeSession()
+
+    async def start_session(self):
+        return self.session
+
+
+class SessionRecordingDatabase:
+    """
+    Wraps a mongomock database, which rejects the session argument: each
+    call is recorded as (collection, method, in a transaction) and passed
+    on without its session.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.calls = []
+
+    def __getattr__(self, name):
+        collection = self.database[name]
+        calls = self.calls
+
+        class Collection:
+            def __getattr__(self, method):
+                target = getattr(collection, method)
+
+                def call(*args, session=None, **kwargs):
+                    calls.append((name, method, session is not None and session.in_transaction))
+                    return target(*args, **kwargs)
+                return call
+
+        return Collection()
@@ -0,0 +1,51 @@
+"""
+Streaming rollup exports
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow.parquet as pq
+from mongomock_motor import AsyncMongoMockClient
+
+import analytics
+
+
+def make_db(weeks):
+    db = AsyncMongoMockClient()["analytics_test"]
+    start = datetime(2024, 1, 7)
+    asyncio.run(db.analytics_weekly_signups.insert_many([
+        {"week": start + timedelta(weeks=week), "signups": week + 1, "paid": week % 2, "conversion_rate": (week % 2) / (week + 1)}
+        for week in reversed(range(weeks))
+    ]))
+    return db
+
+
+class TestExportRollup:
+    def test_parquet_row_group_per_batch(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(analytics, "EXPORT_BATCH_SIZE", 2)
+        db = make_db(5)
+
+        path = asyncio.run(analytics.export_rollup(db, "weekly_signups", tmp_path))
+
+        assert pq.ParquetFile(path).num_row_groups == 3
+        frame = pd.read_parquet(path)
+        assert frame["signups"].tolist() == [1, 2, 3, 4, 5]
+        assert list(frame.columns) == ["week", "signups", "paid", "conversion_rate"]
+
+    def test_csv_appends_each_batch(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(analytics, "EXPORT_BATCH_SIZE", 2)
+        db = make_db(5)
+
+        path = asyncio.run(analytics.export_rollup(db, "weekly_signups", tmp_path, "csv"))
+
+        lines = path.read_text().splitlines()
+        assert lines[0] == "week,signups,paid,conversion_rate"
+        assert pd.read_csv(path)["signups"].tolist() == [1, 2, 3, 4, 5]
+
+    def test_empty_rollup(self, tmp_path):
+        db = AsyncMongoMockClient()["analytics_test"]
+
+        path = asyncio.run(analytics.export_rollup(db, "weekly_signups", tmp_path))
+
+        assert len(pd.read_parquet(path)) == 0
@@ -0,0 +1,92 @@
+"""
+Concurrency tests for the single-write signup and usage paths
+"""
+import asyncio
+
+from fastapi import HTTPException
+
+import routes.auth
+import routes.beta
+import routes.reflections
+from fakes import FakeCollection, FakeDatabase
+from models.beta_signup import BetaSignupCreate
+from models.user import User, UserCreate
+
+CONCURRENT_REQUESTS = 300
+
+
+async def fake_hash(password):
+    return f"hashed-{password}"
+
+
+class TestConcurrentSignup:
+    """Hundreds of simultaneous signups for one email produce one user"""
+
+    def test_signup_same_email(self, monkeypatch):
+        users = FakeCollection(unique=("email", "id"))
+        monkeypatch.setattr(routes.auth, "db", FakeDatabase(users=users))
+        monkeypatch.setattr(routes.auth, "get_password_hash_async", fake_hash)
+
+        async def attempt():
+            try:
+                return await routes.auth.signup(UserCreate(email="race@example.com", password="pw"))
+            except HTTPException as e:
+                return e
+
+        async def run():
+            return await asyncio.gather(*[attempt() for _ in range(CONCURRENT_REQUESTS)])
+
+        results = asyncio.run(run())
+
+        succeeded = [r for r in results if not isinstance(r, HTTPException)]
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(succeeded) == 1
+        assert all(r.status_code == 400 for r in rejected)
+        assert len(users.documents) == 1
+        # Exactly one database round trip per request
+        assert users.ops == {"insert_one": CONCURRENT_REQUESTS}
+
+
+class TestConcurrentBetaSignup:
+    """Hundreds of simultaneous beta signups for one email produce one signup"""
+
+    def test_beta_signup_same_email(self, monkeypatch):
+        beta_signups = FakeCollection(unique=("email",))
+        monkeypatch.setattr(routes.beta, "db", FakeDatabase(beta_signups=beta_signups))
+
+        async def run():
+            return await asyncio.gather(*[
+                routes.beta.create_beta_signup(BetaSignupCreate(email="race@example.com"))
+                for _ in range(CONCURRENT_REQUESTS)
+            ])
+
+        results = asyncio.run(run())
+
+        assert all(r.success for r in results)
+        assert sum("Thank you" in r.message for r in results) == 1
+        assert sum("already" in r.message for r in results) == CONCURRENT_REQUESTS - 1
+        assert len(beta_signups.documents) == 1
+        assert beta_signups.ops == {"insert_one": CONCURRENT_REQUESTS}
+
+
+class TestConcurrentFreeUsage:
+    """Concurrent increments never push the counter past the free limit"""
+
+    def test_increment_free_usage_respects_limit(self, monkeypatch):
+        user = User(email="quota@example.com", hashed_password="hashed")
+        users = FakeCollection(unique=("email", "id"))
+        users.documents.append(user.model_dump())
+        monkeypatch.setattr(routes.reflections, "db", FakeDatabase(users=users))
+        monkeypatch.setattr(routes.reflections, "FREE_REFLECTION_LIMIT", 3)
+
+        async def run():
+            return await asyncio.gather(*[
+                routes.reflections.increment_free_usage(user)
+                for _ in range(CONCURRENT_REQUESTS)
+            ])
+
+        results = asyncio.run(run())
+
+        succeeded = [r for r in results if r["success"]]
+        assert sorted(r["free_reflections_used"] for r in succeeded) == [1, 2, 3]
+        assert users.documents[0]["free_reflections_used"] == 3
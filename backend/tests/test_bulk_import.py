@@ -0,0 +1,112 @@
+"""
+Bulk beta signup import and tester promotion
+"""
+import asyncio
+
+import pytest
+from email_validator import EmailNotValidError, validate_email
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import invalidation
+from cache import TTLCache
+
+from bulk_import import aiter_lines, import_signups, iter_lines, normalize_email, promote_beta_testers, summarize
+
+
+async def run_import(db, lines, format="csv", **kwargs):
+    return [report async for report in import_signups(db, aiter_lines(lines), format, **kwargs)]
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestImportSignups:
+    def make_db(self):
+        return AsyncMongoMockClient()["bulk_import_test"]
+
+    def test_csv_batches_validate_and_upsert(self):
+        db = self.make_db()
+        lines = ["name,Email", "Ann,ann@example.com", "Bob,not-an-email", "Cy,cy@example.com", "Ann,ann@example.com"]
+
+        reports = asyncio.run(run_import(db, lines, batch_size=2))
+
+        assert [report["rows"] for report in reports] == [2, 2]
+        assert summarize(reports)["inserted"] == 2
+        assert reports[0]["errors"][0]["email"] == "not-an-email"
+        assert asyncio.run(db.beta_signups.count_documents({})) == 2
+
+    def test_reimport_keeps_existing_signups(self):
+        db = self.make_db()
+        asyncio.run(run_import(db, ['{"email": "ann@example.com"}'], format="ndjson"))
+        original = asyncio.run(db.beta_signups.find_one({"email": "ann@example.com"}))
+
+        reports = asyncio.run(run_import(db, ['{"email": "ann@example.com"}', '{"email": "bob@example.com"}'], format="ndjson"))
+
+        assert (reports[0]["inserted"], reports[0]["existing"]) == (1, 1)
+        assert asyncio.run(db.beta_signups.find_one({"email": "ann@example.com"}))["id"] == original["id"]
+
+    def test_promote_flags_matching_users(self):
+        db = self.make_db()
+        asyncio.run(db.users.insert_many([
+            {"email": "ann@example.com", "is_beta_tester": False},
+            {"email": "bob@example.com", "is_beta_tester": False},
+        ]))
+
+        reports = asyncio.run(run_import(db, ["ann@example.com"], promote=True))
+
+        assert reports[0]["promoted"] == 1
+        testers = asyncio.run(db.users.distinct("email", {"is_beta_tester": True}))
+        assert testers == ["ann@example.com"]
+
+    def test_promote_invalidates_users_in_every_worker(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+        monkeypatch.setattr(invalidation, "CACHE_INVALIDATION_ENABLED", True)
+        users = TTLCache(maxsize=10, ttl=60)
+        users.set("ann@example.com", "stale")
+        monkeypatch.setitem(invalidation.CACHES, "users", users)
+        db = database.db
+        asyncio.run(db.users.insert_one({"email": "ann@example.com", "is_beta_tester": False}))
+
+        asyncio.run(run_import(db, ["ann@example.com", "cy@example.com"], promote=True))
+
+        assert users.get("ann@example.com") is None
+        broadcast = asyncio.run(db.cache_invalidations.distinct("key", {"cache": "users"}))
+        assert broadcast == ["ann@example.com"]
+
+    def test_promote_beta_testers_joins_signups_to_users(self):
+        db = self.make_db()
+        asyncio.run(db.users.insert_many([
+            {"email": "ann@example.com", "is_beta_tester": False},
+            {"email": "bob@example.com", "is_beta_tester": False},
+        ]))
+        asyncio.run(run_import(db, ["ann@example.com", "cy@example.com"]))
+
+        async def promote():
+            return [report async for report in promote_beta_testers(db)]
+
+        assert summarize(asyncio.run(promote()))["promoted"] == 1
+        assert summarize(asyncio.run(promote())) == {"batches": 0}
+
+
+def test_iter_lines_splits_across_chunks():
+    async def collect():
+        return [line async for line in iter_lines(chunks(b"a@x.com\nb@", b"x.com\n", b"c@x.com"))]
+
+    assert asyncio.run(collect()) == ["a@x.com", "b@x.com", "c@x.com"]
+
+
+@pytest.mark.parametrize("email", [
+    "a+b@Sub.EXAMPLE.co.uk", "Info@example.com", "a..b@example.com", "ü@example.com",
+    "a@bücher.de", "a@-x.com", "a@x", "x" * 65 + "@example.com", "a b@example.com",
+])
+def test_normalize_email_matches_validate_email(email):
+    def outcome(validate):
+        try:
+            return validate(email)
+        except EmailNotValidError as e:
+            return str(e)
+
+    assert outcome(normalize_email) == outcome(lambda e: validate_email(e, check_deliverability=False).normalized)
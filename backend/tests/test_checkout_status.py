@@ -0,0 +1,85 @@
+"""
+Checkout status polling: settled sessions, expiry and coalesced provider calls
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from models.payment import CheckoutStatusResponse
+from models.user import User
+from payment_provider import StubPaymentClient, get_payment_client
+from routes.auth import get_current_user
+from routes.payments import checkout_status_cache, router
+
+CONCURRENT_POLLS = 20
+
+
+class ExpiringProvider(StubPaymentClient):
+    """Reports every session as expired and unpaid, as Stripe does"""
+
+    async def get_checkout_status(self, session_id: str):
+        await self._call("get_checkout_status")
+        return CheckoutStatusResponse(status="expired", payment_status="unpaid", amount_total=100, currency="usd", metadata={})
+
+
+@pytest.fixture
+def make_app(monkeypatch):
+    monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+    checkout_status_cache.clear()
+
+    def make(provider, payment_status="pending"):
+        asyncio.run(database.db.payment_transactions.insert_one({
+            "session_id": "cs_1", "user_id": "user-1", "email": "payer@example.com",
+            "amount": 1.0, "currency": "usd", "payment_status": payment_status, "metadata": {}
+        }))
+        app = FastAPI()
+        app.include_router(router, prefix="/api/payments")
+        app.dependency_overrides[get_payment_client] = lambda: provider
+        app.dependency_overrides[get_current_user] = lambda: User(email="payer@example.com", hashed_password="x")
+        return app
+
+    yield make
+    checkout_status_cache.clear()
+
+
+async def poll(app, times=1):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        responses = await asyncio.gather(*[http.get("/api/payments/checkout-status/cs_1") for _ in range(times)])
+    return [response.json() for response in responses]
+
+
+class TestCheckoutStatus:
+    def test_settled_session_is_answered_without_the_provider(self, make_app):
+        provider = StubPaymentClient()
+        app = make_app(provider, payment_status="paid")
+
+        [status] = asyncio.run(poll(app))
+
+        assert (status["status"], status["payment_status"], status["amount_total"]) == ("complete", "paid", 100)
+        assert provider.calls == {}
+
+    def test_expired_session_reports_the_same_status_on_every_poll(self, make_app):
+        provider = ExpiringProvider()
+        app = make_app(provider)
+
+        [first] = asyncio.run(poll(app))
+        checkout_status_cache.clear()
+        [second] = asyncio.run(poll(app))
+
+        assert (first["status"], first["payment_status"]) == ("expired", "expired")
+        assert (second["status"], second["payment_status"]) == ("expired", "expired")
+        assert provider.calls == {"get_checkout_status": 1}
+
+    def test_concurrent_polls_share_one_provider_call(self, make_app):
+        provider = StubPaymentClient(latency=0.05)
+        app = make_app(provider)
+
+        statuses = asyncio.run(poll(app, times=CONCURRENT_POLLS))
+
+        assert {status["payment_status"] for status in statuses} == {"unpaid"}
+        assert provider.calls == {"get_checkout_status": 1}
@@ -0,0 +1,52 @@
+"""
+Shared client lifecycle
+"""
+import asyncio
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import routes.admin
+import server
+
+
+class TestClientLifecycle:
+    def test_use_before_connect_raises(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", None)
+
+        with pytest.raises(RuntimeError, match="not connected"):
+            database.get_client()
+        with pytest.raises(RuntimeError, match="not connected"):
+            database.db.users
+        assert database._client is None
+
+    def test_proxy_follows_installed_client(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", None)
+        client = AsyncMongoMockClient()
+
+        database.use_client(client)
+
+        assert database.get_client() is client
+        assert database.db.users.database.name == database.DB_NAME
+
+    def test_close_disconnects(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+
+        database.close()
+
+        with pytest.raises(RuntimeError):
+            database.get_client()
+
+
+def test_db_stats_require_admin_key(monkeypatch):
+    monkeypatch.setattr(routes.admin, "ADMIN_API_KEY", "admin-key")
+
+    async def get(headers):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/db-stats", headers=headers)
+
+    assert asyncio.run(get({})).status_code == 401
+    assert "open_connections" in asyncio.run(get({"X-Admin-Key": "admin-key"})).json()
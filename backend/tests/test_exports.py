@@ -0,0 +1,104 @@
+"""
+Admin NDJSON/CSV exports
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import routes.admin
+
+
+def make_app(monkeypatch):
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(database, "_client", client)
+    monkeypatch.setattr(routes.admin, "ADMIN_API_KEY", "admin-key")
+    app = FastAPI()
+    app.include_router(routes.admin.router, prefix="/api/admin")
+    return app, client[database.DB_NAME]
+
+
+async def get(app, path, headers, **params):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, params=params, headers=headers)
+
+
+async def download(app, path, **params):
+    response = await get(app, path, {"X-Admin-Key": "admin-key"}, **params)
+    response.raise_for_status()
+    return response
+
+
+class TestUserExport:
+    def seed(self, db):
+        asyncio.run(db.users.insert_many([
+            {"id": "u1", "email": "ann@example.com", "hashed_password": "x", "created_at": datetime(2024, 1, 2, 3, 4, 5),
+             "has_paid": True, "is_beta_tester": False, "free_reflections_used": 1},
+            # Legacy account from before created_at and the beta flag existed
+            {"id": "u0", "email": "old@example.com", "hashed_password": "x", "has_paid": False},
+        ]))
+
+    def test_ndjson_handles_missing_fields(self, monkeypatch):
+        app, db = make_app(monkeypatch)
+        self.seed(db)
+
+        response = asyncio.run(download(app, "/api/admin/users/export"))
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert rows == [
+            {"id": "u0", "email": "old@example.com", "created_at": None, "has_paid": False,
+             "is_beta_tester": None, "free_reflections_used": None},
+            {"id": "u1", "email": "ann@example.com", "created_at": "2024-01-02T03:04:05", "has_paid": True,
+             "is_beta_tester": False, "free_reflections_used": 1},
+        ]
+
+    def test_csv(self, monkeypatch):
+        app, db = make_app(monkeypatch)
+        self.seed(db)
+
+        response = asyncio.run(download(app, "/api/admin/users/export", format="csv"))
+
+        assert response.headers["content-disposition"] == "attachment; filename=users.csv"
+        assert response.text.splitlines() == [
+            "id,email,created_at,has_paid,is_beta_tester,free_reflections_used",
+            "u0,old@example.com,,False,,",
+            "u1,ann@example.com,2024-01-02T03:04:05,True,False,1",
+        ]
+
+
+class TestBetaSignupExport:
+    def test_ndjson(self, monkeypatch):
+        app, db = make_app(monkeypatch)
+        asyncio.run(db.beta_signups.insert_one(
+            {"id": "s1", "email": "ann@example.com", "created_at": datetime(2024, 1, 2), "status": "pending"}
+        ))
+
+        response = asyncio.run(download(app, "/api/admin/beta-signups/export"))
+
+        assert response.headers["content-disposition"] == "attachment; filename=beta_signups.ndjson"
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {"id": "s1", "email": "ann@example.com", "created_at": "2024-01-02T00:00:00", "status": "pending"}
+        ]
+
+    def test_requires_admin_key(self, monkeypatch):
+        app, db = make_app(monkeypatch)
+        asyncio.run(db.beta_signups.insert_one({"id": "s1", "email": "ann@example.com", "status": "pending"}))
+
+        missing = asyncio.run(get(app, "/api/admin/beta-signups/export", {}))
+        wrong = asyncio.run(get(app, "/api/admin/beta-signups/export", {"X-Admin-Key": "guess"}))
+
+        assert (missing.status_code, wrong.status_code) == (401, 401)
+        assert "ann@example.com" not in missing.text + wrong.text
+
+    def test_non_ascii_key_is_rejected(self, monkeypatch):
+        app, _ = make_app(monkeypatch)
+
+        response = asyncio.run(get(app, "/api/admin/beta-signups/export", {"X-Admin-Key": "clé".encode()}))
+
+        assert response.status_code == 401
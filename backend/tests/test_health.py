@@ -0,0 +1,182 @@
+"""
+Readiness state served by the background health checker
+"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from health import HealthChecker
+from models.payment import CheckoutStatusResponse
+from payment_provider import PaymentClient
+from indexes import INDEXES, REQUIRED_INDEXES, ensure_indexes
+
+
+class PingDatabase:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.pings = 0
+
+    async def command(self, name):
+        self.pings += 1
+        if not self.healthy:
+            raise ConnectionError("no primary available")
+        return {"ok": 1}
+
+    def __getitem__(self, name):
+        return IndexedCollection(REQUIRED_INDEXES.get(name, []))
+
+
+class IndexedCollection:
+    def __init__(self, names):
+        self.names = names
+
+    async def index_information(self):
+        return {name: {} for name in self.names}
+
+
+class UnreachableCollection:
+    async def _unreachable(self, *args, **kwargs):
+        raise ServerSelectionTimeoutError("No servers found yet")
+
+    create_indexes = update_many = _unreachable
+
+
+class UnreachableDatabase:
+    """MongoDB down at boot: every operation times out selecting a server"""
+
+    def __init__(self):
+        self.status_checks = UnreachableCollection()
+
+    def __getitem__(self, name):
+        return UnreachableCollection()
+
+    async def list_collection_names(self, **kwargs):
+        raise ServerSelectionTimeoutError("No servers found yet")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubPayments:
+    configured = True
+    last_call = None
+
+
+class FlakyCheckout:
+    """Stands in for StripeCheckout; fails while the provider is down"""
+
+    def __init__(self):
+        self.down = True
+
+    async def get_checkout_status(self, session_id):
+        if self.down:
+            raise ConnectionError("provider unreachable")
+        return CheckoutStatusResponse(status="complete", payment_status="paid", amount_total=100, currency="usd")
+
+
+class TestHealthChecker:
+    """Probes read a cached result; only refresh() touches the database"""
+
+    def test_not_ready_before_first_check(self):
+        checker = HealthChecker(PingDatabase(), StubPayments(), clock=FakeClock())
+
+        assert checker.ready is False
+        assert checker.report()["status"] == "not_ready"
+
+    def test_report_is_cached_between_refreshes(self):
+        db = PingDatabase()
+        checker = HealthChecker(db, StubPayments(), clock=FakeClock())
+        asyncio.run(checker.refresh())
+
+        for _ in range(50):
+            assert checker.ready is True
+        assert db.pings == 1
+        assert checker.report()["payments"] == {"status": "configured"}
+
+    def test_database_failure_is_not_ready(self):
+        checker = HealthChecker(PingDatabase(healthy=False), StubPayments(), clock=FakeClock())
+        asyncio.run(checker.refresh())
+
+        assert checker.ready is False
+        assert checker.report()["database"]["status"] == "disconnected"
+
+    def test_stale_result_is_not_ready(self):
+        clock = FakeClock()
+        checker = HealthChecker(PingDatabase(), StubPayments(), interval=5, clock=clock)
+        asyncio.run(checker.refresh())
+
+        clock.now = 16
+        assert checker.stale is True
+        assert checker.ready is False
+
+    def test_missing_unique_index_is_not_ready(self):
+        db = AsyncMongoMockClient()["health_test"]
+        checker = HealthChecker(db, StubPayments(), clock=FakeClock())
+        asyncio.run(checker.refresh())
+
+        assert checker.ready is False
+        assert checker.report()["indexes"]["missing"]["users"] == ["email_unique", "id_unique"]
+
+    def test_index_setup_is_retried_until_it_completes(self):
+        db = AsyncMongoMockClient()["health_test"]
+        attempts = []
+
+        async def setup_indexes():
+            attempts.append(1)
+            if len(attempts) == 1:
+                return await ensure_indexes(UnreachableDatabase())
+            return await ensure_indexes(db)
+
+        checker = HealthChecker(db, StubPayments(), clock=FakeClock(), setup_indexes=setup_indexes)
+        asyncio.run(checker.refresh())
+        assert checker.ready is False
+
+        asyncio.run(checker.refresh())
+        asyncio.run(checker.refresh())
+
+        assert checker.ready is True
+        assert len(attempts) == 2
+
+    def test_payments_report_the_latest_provider_call(self):
+        payments = PaymentClient(api_key="sk_test")
+        checkout = FlakyCheckout()
+        payments._checkouts.set("", checkout)
+        checker = HealthChecker(PingDatabase(), payments, clock=FakeClock())
+
+        asyncio.run(checker.refresh())
+        assert checker.report()["payments"] == {"status": "configured"}
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(payments.get_checkout_status("cs_1"))
+        asyncio.run(checker.refresh())
+        report = checker.report()["payments"]
+        assert (report["status"], report["error"]) == ("failing", "provider unreachable")
+
+        checkout.down = False
+        asyncio.run(payments.get_checkout_status("cs_1"))
+        asyncio.run(checker.refresh())
+        assert checker.report()["payments"]["status"] == "reachable"
+        assert checker.ready is True
+
+    def test_unconfigured_payments_are_reported(self):
+        checker = HealthChecker(PingDatabase(), PaymentClient(api_key=None), clock=FakeClock())
+        asyncio.run(checker.refresh())
+
+        assert checker.report()["payments"] == {"status": "not_configured"}
+
+
+def test_ensure_indexes_survives_unreachable_database():
+    assert asyncio.run(ensure_indexes(UnreachableDatabase())) is False
+
+
+def test_required_indexes_are_declared():
+    for collection, names in REQUIRED_INDEXES.items():
+        declared = {index.document["name"]: index.document for index in INDEXES[collection]}
+        assert all(declared[name].get("unique") for name in names), collection
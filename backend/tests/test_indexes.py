@@ -0,0 +1,35 @@
+"""
+Declared indexes cover the route query shapes
+"""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from indexes import INDEXES, QUERY_SHAPES, ensure_indexes
+
+
+def index_keys(collection):
+    return [list(index.document["key"].items()) for index in INDEXES[collection]]
+
+
+def test_every_query_shape_has_a_covering_index():
+    for collection, query, sort in QUERY_SHAPES:
+        wanted = [(field, 1) for field in query] + list(sort or [])
+        assert any(keys[:len(wanted)] == wanted for keys in index_keys(collection)), (collection, query, sort)
+
+
+def test_status_checks_keep_ttl_and_keyset_indexes():
+    names = [index.document["name"] for index in INDEXES["status_checks"]]
+
+    assert names == ["timestamp_id", "timestamp_ttl"]
+
+
+def test_startup_leaves_data_migration_to_manage_py():
+    db = AsyncMongoMockClient()["indexes_test"]
+    asyncio.run(db.status_checks.insert_one({"id": "legacy", "timestamp": "2024-01-01T00:00:00+00:00"}))
+
+    assert asyncio.run(ensure_indexes(db)) is True
+
+    legacy = asyncio.run(db.status_checks.find_one({"id": "legacy"}))
+    assert legacy["timestamp"] == "2024-01-01T00:00:00+00:00"
+    assert "timestamp_id" in asyncio.run(db.status_checks.index_information())
@@ -0,0 +1,45 @@
+"""
+Cross-worker cache invalidation through the cache_invalidations collection
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from cache import TTLCache
+from invalidation import InvalidationListener, register_cache
+
+
+class TestInvalidationListener:
+    def test_applies_other_workers_invalidations_once(self):
+        db = AsyncMongoMockClient()["invalidation_test"]
+        users = TTLCache(maxsize=10, ttl=60)
+        register_cache("test_users", users)
+        users.set("paid@example.com", {"has_paid": False})
+        users.set("other@example.com", {"has_paid": False})
+        listener = InvalidationListener(db)
+
+        async def scenario():
+            await db.cache_invalidations.insert_one({
+                "cache": "test_users",
+                "key": "paid@example.com",
+                "created_at": datetime.utcnow()
+            })
+            first = await listener.poll_once()
+            users.set("paid@example.com", {"has_paid": True})
+            second = await listener.poll_once()
+            return first, second
+
+        assert asyncio.run(scenario()) == (1, 0)
+        assert users.get("paid@example.com") == {"has_paid": True}
+        assert users.get("other@example.com") == {"has_paid": False}
+
+    def test_ignores_invalidations_from_before_start(self):
+        db = AsyncMongoMockClient()["invalidation_test_old"]
+        asyncio.run(db.cache_invalidations.insert_one({
+            "cache": "test_users",
+            "key": "old@example.com",
+            "created_at": datetime.utcnow() - timedelta(minutes=5)
+        }))
+
+        assert asyncio.run(InvalidationListener(db).poll_once()) == 0
@@ -0,0 +1,153 @@
+"""
+Structured logging: redaction, sampling, request ids and the bounded queue
+"""
+import asyncio
+import io
+import json
+import logging
+import logging.config
+import queue
+
+import httpx
+from fastapi import FastAPI
+
+import logconfig
+from logconfig import (
+    DroppingQueueHandler, JSONFormatter, LOG_RECORDS_DROPPED, RequestIdFilter, RequestLogMiddleware, SamplingFilter,
+    UVICORN_LOG_CONFIG
+)
+
+
+def make_record(name="routes.auth", level=logging.INFO, msg="User logged in: %s", args=("someone@example.com",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_json_formatter_redacts_emails_and_keeps_extras():
+    entry = json.loads(JSONFormatter(redact_emails=True).format(make_record(request_id="abc", duration_ms=1.5)))
+
+    assert entry["message"] == "User logged in: s***@example.com"
+    assert (entry["request_id"], entry["duration_ms"], entry["level"]) == ("abc", 1.5, "INFO")
+
+
+def test_sampling_uses_most_specific_logger_and_keeps_warnings():
+    sampler = SamplingFilter(default_rate=1.0, rates={"routes": 0.0, "routes.auth": 0.5}, rng=lambda: 0.7)
+
+    assert not sampler.filter(make_record(name="routes.auth"))
+    assert not sampler.filter(make_record(name="routes.beta"))
+    assert sampler.filter(make_record(name="routes.auth", level=logging.ERROR))
+    assert sampler.filter(make_record(name="server"))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    before = LOG_RECORDS_DROPPED._values.get((), 0)
+
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.get_nowait().getMessage() == "User logged in: someone@example.com"
+    assert LOG_RECORDS_DROPPED._values.get((), 0) == before + 1
+
+
+def test_request_id_reaches_route_logs_and_response():
+    app = FastAPI()
+    route_logger = logging.getLogger("routes.test")
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        route_logger.info("Fetched %s", item_id)
+        return {"id": item_id}
+
+    app.add_middleware(RequestLogMiddleware)
+    captured = ListHandler()
+    captured.addFilter(RequestIdFilter())
+    for name in ("routes.test", "access"):
+        logging.getLogger(name).addHandler(captured)
+        logging.getLogger(name).setLevel(logging.INFO)
+
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/items/1", headers={"X-Request-ID": "req-1"})
+
+    try:
+        response = asyncio.run(get())
+    finally:
+        for name in ("routes.test", "access"):
+            logging.getLogger(name).removeHandler(captured)
+
+    assert response.headers["x-request-id"] == "req-1"
+    route_record, access_record = captured.records
+    assert route_record.request_id == access_record.request_id == "req-1"
+    assert (access_record.route, access_record.status) == ("/items/{item_id}", 200)
+    assert access_record.duration_ms >= 0
+
+
+def test_unhandled_error_response_carries_request_id():
+    app = FastAPI()
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(RequestLogMiddleware)
+    captured = ListHandler()
+    logging.getLogger("access").addHandler(captured)
+
+    async def get():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/boom", headers={"X-Request-ID": "req-2"})
+
+    try:
+        response = asyncio.run(get())
+    finally:
+        logging.getLogger("access").removeHandler(captured)
+
+    assert response.status_code == 500
+    assert response.headers["x-request-id"] == "req-2"
+    assert response.text == "Internal Server Error"
+    assert (captured.records[0].status, captured.records[0].levelno) == (500, logging.WARNING)
+
+
+def test_uvicorn_log_config_routes_through_the_queue():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    uvicorn_loggers = [logging.getLogger(name) for name in ("uvicorn", "uvicorn.error", "uvicorn.access")]
+    saved_uvicorn = [(logger.handlers[:], logger.propagate) for logger in uvicorn_loggers]
+    stream = io.StringIO()
+    logconfig.stop_logging()
+    logconfig.configure_logging(stream=stream)
+
+    try:
+        logging.config.dictConfig(UVICORN_LOG_CONFIG)
+        logging.getLogger("uvicorn.error").warning("Started server process")
+    finally:
+        logconfig.stop_logging()
+        root.handlers[:], root.level = saved
+        for logger, (handlers, propagate) in zip(uvicorn_loggers, saved_uvicorn):
+            logger.handlers[:], logger.propagate = handlers, propagate
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert (entry["logger"], entry["message"]) == ("uvicorn.error", "Started server process")
+
+
+def test_importing_server_leaves_logging_alone():
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+
+    import server  # noqa: F401
+
+    assert root.handlers == handlers
+    assert logconfig._listener is None
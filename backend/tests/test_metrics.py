@@ -0,0 +1,56 @@
+"""
+Prometheus exposition and MongoDB command timings
+"""
+from types import SimpleNamespace
+
+from metrics import Counter, Histogram, MONGO_COMMAND_LATENCY, MONGO_COMMAND_FAILURES
+from database import CommandTimings
+
+
+def command_event(name, command, request_id, duration_micros=1500):
+    return SimpleNamespace(
+        command_name=name,
+        command=command,
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+        duration_micros=duration_micros
+    )
+
+
+class TestExposition:
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_latency_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, ("/api/x/{id}",))
+
+        lines = histogram.render().splitlines()
+
+        assert lines[:2] == ["# HELP test_latency_seconds Test latency", "# TYPE test_latency_seconds histogram"]
+        assert 'test_latency_seconds_bucket{route="/api/x/{id}",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{route="/api/x/{id}",le="1.0"} 3' in lines
+        assert 'test_latency_seconds_bucket{route="/api/x/{id}",le="+Inf"} 4' in lines
+        assert 'test_latency_seconds_count{route="/api/x/{id}"} 4' in lines
+
+    def test_label_values_are_escaped(self):
+        counter = Counter("test_total", "Test", ("path",))
+        counter.inc(('a"b\\c',))
+
+        assert 'test_total{path="a\\"b\\\\c"} 1' in counter.render()
+
+    def test_unlabelled_counter_starts_at_zero(self):
+        assert Counter("test_rejected_total", "Test").render().endswith("test_rejected_total 0")
+
+
+class TestCommandTimings:
+    def test_records_collection_and_command(self):
+        listener = CommandTimings()
+        listener.started(command_event("find", {"find": "users", "filter": {}}, request_id=1))
+        listener.started(command_event("getMore", {"getMore": 123, "collection": "reflections"}, request_id=2))
+        before = MONGO_COMMAND_LATENCY.count(("users", "find"))
+
+        listener.succeeded(command_event("find", None, request_id=1))
+        listener.failed(command_event("getMore", None, request_id=2))
+
+        assert MONGO_COMMAND_LATENCY.count(("users", "find")) == before + 1
+        assert MONGO_COMMAND_FAILURES.value(("reflections", "getMore")) >= 1
+        assert listener._pending == {}
@@ -0,0 +1,81 @@
+"""
+The bounded bcrypt pool sheds load with 503s instead of queueing forever
+"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+import auth
+import routes.auth
+from auth import PasswordHasher, PasswordHasherBusy
+
+
+def make_app():
+    app = FastAPI()
+    app.include_router(routes.auth.router, prefix="/api/auth")
+    return app
+
+
+async def saturate(hasher, release):
+    """Occupy every worker and queue slot with calls blocked on release"""
+    calls = [
+        asyncio.create_task(hasher._run("hash", release.wait))
+        for _ in range(hasher.max_workers + hasher.max_queue)
+    ]
+    while hasher.pending < len(calls):
+        await asyncio.sleep(0)
+    return calls
+
+
+class TestPasswordHasherSaturation:
+    def test_rejects_beyond_max_pending(self):
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def run():
+            calls = await saturate(hasher, release)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.hash("password")
+            release.set()
+            await asyncio.gather(*calls)
+            return await hasher.verify("password", await hasher.hash("password"))
+
+        try:
+            assert asyncio.run(run()) is True
+        finally:
+            release.set()
+            hasher.shutdown()
+        assert hasher.pending == 0
+
+    @pytest.mark.parametrize("path", ["/api/auth/signup", "/api/auth/login"])
+    def test_signup_and_login_return_503_when_saturated(self, monkeypatch, path):
+        hasher = PasswordHasher(max_workers=1, max_queue=2)
+        monkeypatch.setattr(auth, "password_hasher", hasher)
+        db = AsyncMongoMockClient()["auth_test"]
+        monkeypatch.setattr(routes.auth, "db", db)
+        asyncio.run(db.users.insert_one({
+            "id": "user-1", "email": "busy@example.com", "hashed_password": auth.get_password_hash("password")
+        }))
+        release = threading.Event()
+
+        async def run():
+            calls = await saturate(hasher, release)
+            transport = httpx.ASGITransport(app=make_app())
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post(path, json={"email": "busy@example.com", "password": "password"})
+            release.set()
+            await asyncio.gather(*calls)
+            return response
+
+        try:
+            response = asyncio.run(run())
+        finally:
+            release.set()
+            hasher.shutdown()
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,69 @@
+"""
+Provider calls are bounded by the client's timeout
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from models.user import User
+from payment_provider import PaymentClient, get_payment_client
+from routes.auth import get_current_user
+from routes.payments import router
+
+
+class HangingCheckout:
+    """Stands in for StripeCheckout when the provider never answers"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def _hang(self, *args):
+        self.calls += 1
+        await asyncio.sleep(60)
+
+    create_checkout_session = get_checkout_status = handle_webhook = _hang
+
+
+def make_client(timeout=0.05):
+    client = PaymentClient(api_key="sk_test", timeout=timeout)
+    checkout = HangingCheckout()
+    client._checkouts.set("", checkout)
+    return client, checkout
+
+
+def test_provider_calls_time_out():
+    client, checkout = make_client()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.get_checkout_status("cs_slow"))
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.handle_webhook(b"{}", "sig"))
+    assert checkout.calls == 2
+
+
+def test_checkout_status_returns_504_when_provider_hangs(monkeypatch):
+    monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+    asyncio.run(database.db.payment_transactions.insert_one({
+        "session_id": "cs_slow", "user_id": "user-1", "email": "someone@example.com",
+        "amount": 9.99, "currency": "usd", "payment_status": "pending", "metadata": {}
+    }))
+    client, checkout = make_client()
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/payments")
+    app.dependency_overrides[get_payment_client] = lambda: client
+    app.dependency_overrides[get_current_user] = lambda: User(email="someone@example.com", hashed_password="x")
+
+    async def poll():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get("/api/payments/checkout-status/cs_slow")
+
+    response = asyncio.run(poll())
+
+    assert response.status_code == 504
+    assert checkout.calls == 1
@@ -0,0 +1,61 @@
+"""
+Database operation counts for the shared payment unlock routine
+"""
+import asyncio
+
+from fakes import FakeCollection, FakeDatabase
+from payment_access import unlock_user_access
+
+
+def make_db():
+    users = FakeCollection(unique=("email", "id"))
+    users.documents.append({"id": "user-1", "email": "payer@example.com", "has_paid": False})
+    transactions = FakeCollection(unique=("session_id",))
+    transactions.documents.append({
+        "session_id": "cs_1",
+        "user_id": "user-1",
+        "email": "payer@example.com",
+        "payment_status": "pending"
+    })
+    return FakeDatabase(users=users, payment_transactions=transactions)
+
+
+class TestUnlockUserAccess:
+    """Unlocking is two conditional writes, with no reads"""
+
+    def test_unlock_uses_two_operations(self):
+        db = make_db()
+
+        unlocked = asyncio.run(unlock_user_access(db, "cs_1", "user-1", "payer@example.com"))
+
+        assert unlocked is True
+        assert db.users.documents[0]["has_paid"] is True
+        assert db.payment_transactions.documents[0]["payment_status"] == "paid"
+        assert db.payment_transactions.ops == {"find_one_and_update": 1}
+        assert db.users.ops == {"update_one": 1}
+
+    def test_repeat_unlock_is_a_no_op(self):
+        db = make_db()
+        asyncio.run(unlock_user_access(db, "cs_1", "user-1", "payer@example.com"))
+
+        unlocked = asyncio.run(unlock_user_access(db, "cs_1", "user-1", "payer@example.com"))
+
+        assert unlocked is False
+        assert db.payment_transactions.ops == {"find_one_and_update": 2}
+        assert db.users.ops == {"update_one": 2}
+
+    def test_racing_poll_and_webhook_unlock_once(self):
+        db = make_db()
+
+        async def race():
+            return await asyncio.gather(
+                unlock_user_access(db, "cs_1", "user-1", "payer@example.com"),
+                unlock_user_access(db, "cs_1", "user-1", "payer@example.com")
+            )
+
+        results = asyncio.run(race())
+
+        assert sorted(results) == [False, True]
+        assert db.payment_transactions.ops == {"find_one_and_update": 2}
+        assert db.users.ops == {"update_one": 2}
+        assert "find_one" not in db.users.ops
@@ -0,0 +1,132 @@
+"""
+Token buckets and the rate-limit middleware
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI, Request
+from mongomock_motor import AsyncMongoMockClient
+
+from ratelimit import MemoryBucketStore, MongoBucketStore, RateLimitMiddleware
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+async def take_many(store, count, capacity=3, per_minute=60):
+    return [(await store.take("ip:/api/auth/login:1.2.3.4", capacity, per_minute))[0] for _ in range(count)]
+
+
+class TestBucketStores:
+    def test_memory_bucket_bursts_then_refills(self):
+        clock = FakeClock()
+        store = MemoryBucketStore(clock=clock)
+
+        assert asyncio.run(take_many(store, 4)) == [True, True, True, False]
+        clock.now = 1.0
+        assert asyncio.run(take_many(store, 2)) == [True, False]
+
+    def test_memory_store_evicts_least_recent_key(self):
+        store = MemoryBucketStore(max_keys=2, clock=FakeClock())
+        for key in ("a", "b", "c"):
+            asyncio.run(store.take(key, 1, 60))
+
+        assert list(store._buckets) == ["b", "c"]
+
+    def test_mongo_bucket_matches_memory_bucket(self):
+        clock = FakeClock(datetime(2026, 1, 1))
+        store = MongoBucketStore(AsyncMongoMockClient()["ratelimit_test"], clock=clock)
+
+        assert asyncio.run(take_many(store, 4)) == [True, True, True, False]
+        clock.now += timedelta(seconds=1)
+        assert asyncio.run(take_many(store, 2)) == [True, False]
+
+
+class TestRateLimitMiddleware:
+    """Over-limit requests never reach the route"""
+
+    def make_app(self, **options):
+        app = FastAPI()
+        app.state.calls = 0
+
+        @app.post("/api/auth/login")
+        async def login(request: Request):
+            app.state.calls += 1
+            return {"email": (await request.json())["email"]}
+
+        app.add_middleware(RateLimitMiddleware, store=MemoryBucketStore(clock=FakeClock()), **options)
+        return app
+
+    async def post_logins(self, app, emails, peer="127.0.0.1", forwarded_for=None):
+        transport = httpx.ASGITransport(app=app, client=(peer, 123))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.post(
+                    "/api/auth/login",
+                    json={"email": email, "password": "wrong"},
+                    headers={"X-Forwarded-For": forwarded_for(i)} if forwarded_for else {}
+                )
+                for i, email in enumerate(emails)
+            ]
+
+    def test_email_bucket_rejects_before_route(self):
+        app = self.make_app()
+
+        responses = asyncio.run(self.post_logins(app, ["Victim@example.com"] * 5 + ["victim@example.com"]))
+
+        assert [r.status_code for r in responses] == [200] * 5 + [429]
+        assert int(responses[-1].headers["retry-after"]) >= 1
+        assert app.state.calls == 5
+
+    def test_body_is_replayed_to_route(self):
+        responses = asyncio.run(self.post_logins(self.make_app(), ["someone@example.com"]))
+
+        assert responses[0].json() == {"email": "someone@example.com"}
+
+    def test_ip_bucket_covers_rotating_emails(self):
+        app = self.make_app()
+
+        responses = asyncio.run(self.post_logins(app, [f"user{i}@example.com" for i in range(21)]))
+
+        assert responses[-1].status_code == 429
+        assert app.state.calls == 20
+
+    def test_ip_bucket_can_be_turned_off(self):
+        app = self.make_app(ip_source="none")
+
+        responses = asyncio.run(self.post_logins(app, [f"user{i}@example.com" for i in range(25)], peer="10.0.0.1"))
+
+        assert {r.status_code for r in responses} == {200}
+
+    def test_clients_behind_one_proxy_get_their_own_buckets(self):
+        app = self.make_app(ip_source="forwarded", trusted_proxies="10.0.0.0/8")
+        emails = [f"user{i}@example.com" for i in range(25)]
+
+        # 25 distinct callers through the same ingress address
+        responses = asyncio.run(self.post_logins(
+            app, emails, peer="10.0.0.1", forwarded_for=lambda i: f"203.0.113.{i}, 10.0.0.2"
+        ))
+        assert {r.status_code for r in responses} == {200}
+
+        # One caller rotating emails through the same ingress is still limited
+        responses = asyncio.run(self.post_logins(
+            app, emails, peer="10.0.0.1", forwarded_for=lambda i: "198.51.100.7"
+        ))
+        assert responses[-1].status_code == 429
+        assert sum(r.status_code == 200 for r in responses) == 20
+
+    def test_forwarded_header_from_untrusted_peer_is_ignored(self):
+        app = self.make_app(ip_source="forwarded", trusted_proxies="10.0.0.0/8")
+
+        responses = asyncio.run(self.post_logins(
+            app, [f"user{i}@example.com" for i in range(21)], peer="198.51.100.9",
+            forwarded_for=lambda i: f"203.0.113.{i}"
+        ))
+
+        assert responses[-1].status_code == 429
@@ -0,0 +1,186 @@
+"""
+Reflection scoring and the reflection endpoints
+"""
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import routes.reflections
+import scoring
+from fakes import FakeClient, SessionRecordingDatabase
+from models.reflection import ReflectionBatchCreate, ReflectionCreate
+from models.user import User
+
+# getScoreInterpretation() in frontend/src/mockData.js: (lowest, highest, title)
+FRONTEND_BANDS = [
+    (0, 9, "Lower Activation Patterns"),
+    (10, 19, "Moderate Nervous System Activation"),
+    (20, 30, "Frequent Activation Patterns"),
+]
+
+
+def answers_totalling(total):
+    """Ten 0-3 answers adding up to total"""
+    answers = [0] * scoring.QUESTION_COUNT
+    for question in range(scoring.QUESTION_COUNT):
+        answers[question] = min(scoring.MAX_ANSWER, total)
+        total -= answers[question]
+    return answers
+
+
+class TestScoring:
+    def test_totals_of_packed_answers(self):
+        vectors = [scoring.pack_answers(answers_totalling(total)) for total in (0, 7, 30)]
+
+        answers = scoring.unpack_answers(vectors)
+
+        assert answers.shape == (3, scoring.QUESTION_COUNT)
+        assert scoring.score_totals(answers).tolist() == [0, 7, 30]
+
+    def test_unpack_nothing(self):
+        assert scoring.unpack_answers([]).shape == (0, scoring.QUESTION_COUNT)
+
+    @pytest.mark.parametrize("lowest,highest,title", FRONTEND_BANDS)
+    def test_bands_match_frontend_thresholds(self, lowest, highest, title):
+        totals = np.arange(lowest, highest + 1)
+
+        bands = scoring.score_bands(totals)
+
+        assert {scoring.BANDS[band]["title"] for band in bands} == {title}
+
+    def test_moving_average_is_trailing(self):
+        values = np.array([2, 4, 6, 8])
+
+        assert scoring.moving_average(values, 2).tolist() == [2, 3, 5, 7]
+        assert scoring.moving_average(values, 3).tolist() == [2, 3, 4, 6]
+
+    def test_summarize(self):
+        answers = scoring.unpack_answers([scoring.pack_answers(answers_totalling(total)) for total in (5, 15, 25)])
+
+        summary = scoring.summarize(answers, window=2)
+
+        assert summary["count"] == 3
+        assert summary["totals"] == [5, 15, 25]
+        assert summary["moving_average"] == [5.0, 10.0, 20.0]
+        assert summary["question_means"] == np.round(answers.mean(axis=0), 3).tolist()
+        assert summary["band_counts"] == {"lower": 1, "moderate": 1, "frequent": 1}
+
+    def test_summarize_no_history(self):
+        summary = scoring.summarize(scoring.unpack_answers([]))
+
+        assert summary["count"] == 0
+        assert summary["question_means"] == [0.0] * scoring.QUESTION_COUNT
+        assert summary["band_counts"] == {"lower": 0, "moderate": 0, "frequent": 0}
+
+
+class TestReflectionEndpoints:
+    @pytest.fixture
+    def user(self, monkeypatch):
+        monkeypatch.setattr(routes.reflections, "db", AsyncMongoMockClient()["reflections_test"])
+        return User(email="reflect@example.com", hashed_password="hashed")
+
+    def submit(self, user, *totals):
+        """POST one reflection, then the rest as a batch"""
+        async def run():
+            first = await routes.reflections.create_reflection(ReflectionCreate(answers=answers_totalling(totals[0])), user)
+            if len(totals) == 1:
+                return [first]
+            rest = await routes.reflections.create_reflections_batch(
+                ReflectionBatchCreate(reflections=[ReflectionCreate(answers=answers_totalling(total)) for total in totals[1:]]),
+                user
+            )
+            return [first] + rest
+
+        return asyncio.run(run())
+
+    def test_create_scores_with_frontend_bands(self, user):
+        results = self.submit(user, 9, 10, 20)
+
+        assert [result.total_score for result in results] == [9, 10, 20]
+        assert [result.title for result in results] == [title for _, _, title in FRONTEND_BANDS]
+        assert [result.band for result in results] == ["lower", "moderate", "frequent"]
+
+    def test_history_newest_first(self, user):
+        self.submit(user, 3, 12)
+        # MongoDB keeps milliseconds; make sure the last one sorts after
+        time.sleep(0.01)
+        latest = self.submit(user, 27)[0]
+
+        history = asyncio.run(routes.reflections.get_reflection_history(limit=2, current_user=user))
+
+        assert len(history) == 2
+        assert (history[0].id, history[0].total_score, history[0].band) == (latest.id, 27, "frequent")
+        assert history[0].created_at >= history[1].created_at
+        assert history[1].total_score in (3, 12)
+
+    def test_history_is_per_user(self, user):
+        self.submit(user, 3, 12)
+        other = User(email="other@example.com", hashed_password="hashed")
+
+        assert asyncio.run(routes.reflections.get_reflection_history(limit=20, current_user=other)) == []
+
+    def test_trend_oldest_first(self, user):
+        self.submit(user, 4, 8, 12, 16)
+
+        trend = asyncio.run(routes.reflections.get_reflection_trend(window=2, current_user=user))
+
+        assert trend["count"] == 4
+        assert trend["totals"] == [4, 8, 12, 16]
+        assert trend["moving_average"] == [4.0, 6.0, 10.0, 14.0]
+        assert trend["band_counts"] == {"lower": 2, "moderate": 2, "frequent": 0}
+
+
+class TestReflectionSummary:
+    """The incrementally maintained aggregate agrees with a full recompute"""
+
+    TOTALS = [2, 9, 10, 19, 20, 30, 14]
+
+    @pytest.fixture
+    def user(self, monkeypatch):
+        monkeypatch.setattr(routes.reflections, "REFLECTION_RECENT_LIMIT", 5)
+        return User(email="summary@example.com", hashed_password="hashed")
+
+    def submit_and_compare(self, user, db):
+        async def run():
+            await routes.reflections.create_reflection(ReflectionCreate(answers=answers_totalling(self.TOTALS[0])), user)
+            await routes.reflections.create_reflections_batch(
+                ReflectionBatchCreate(reflections=[ReflectionCreate(answers=answers_totalling(total)) for total in self.TOTALS[1:4]]),
+                user
+            )
+            for total in self.TOTALS[4:]:
+                await routes.reflections.create_reflection(ReflectionCreate(answers=answers_totalling(total)), user)
+            rows = await db.reflections.find({"user_id": user.id}, {"_id": 0, "answers": 1}).to_list(None)
+            return await routes.reflections.get_reflection_summary(user), rows
+
+        summary, rows = asyncio.run(run())
+        answers = scoring.unpack_answers([row["answers"] for row in rows])
+        recomputed = scoring.summarize(answers)
+
+        assert summary["count"] == recomputed["count"] == len(self.TOTALS)
+        assert summary["question_means"] == recomputed["question_means"]
+        assert summary["question_stddev"] == np.round(answers.std(axis=0), 3).tolist()
+        assert summary["band_counts"] == recomputed["band_counts"]
+        assert summary["recent_totals"] == self.TOTALS[-routes.reflections.REFLECTION_RECENT_LIMIT:]
+        assert summary["recent_average"] == round(float(np.mean(summary["recent_totals"])), 2)
+
+    def test_summary_matches_recompute(self, user, monkeypatch):
+        db = AsyncMongoMockClient()["reflections_test"]
+        monkeypatch.setattr(routes.reflections, "db", db)
+
+        self.submit_and_compare(user, db)
+
+    def test_summary_matches_recompute_in_transactions(self, user, monkeypatch):
+        db = SessionRecordingDatabase(AsyncMongoMockClient()["reflections_test"])
+        client = FakeClient()
+        monkeypatch.setattr(routes.reflections, "db", db)
+        monkeypatch.setattr(routes.reflections, "get_client", lambda: client)
+        monkeypatch.setattr(routes.reflections, "MONGO_TRANSACTIONS", True)
+
+        self.submit_and_compare(user, db)
+
+        writes = [call for call in db.calls if call[1] in ("insert_many", "update_one")]
+        assert writes == [("reflections", "insert_many", True), ("reflection_aggregates", "update_one", True)] * 5
+        assert client.session.committed == 5
@@ -0,0 +1,70 @@
+"""
+GET/POST /api/status: UTC timestamps and keyset paging
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import server
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def seed(count):
+    asyncio.run(database.db.status_checks.insert_many([
+        {"id": f"check-{n:02d}", "client_name": "probe", "timestamp": START + timedelta(minutes=n)}
+        for n in range(count)
+    ]))
+
+
+async def call(method, path, **kwargs):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def get(**params):
+    return asyncio.run(call("GET", "/api/status", params=params))
+
+
+class TestStatusChecks:
+    def test_timestamps_are_utc(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+        created = asyncio.run(call("POST", "/api/status", json={"client_name": "probe"})).json()
+
+        listed = get().json()
+
+        assert listed[0]["id"] == created["id"]
+        assert datetime.fromisoformat(listed[0]["timestamp"]).utcoffset() == timedelta(0)
+        assert datetime.fromisoformat(created["timestamp"].replace("Z", "+00:00")).utcoffset() == timedelta(0)
+
+    def test_cursor_pages_through_everything(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+        seed(5)
+
+        pages, cursor = [], None
+        while True:
+            response = get(limit=2, **({"cursor": cursor} if cursor else {}))
+            pages.append([row["id"] for row in response.json()])
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+
+        assert pages == [["check-00", "check-01"], ["check-02", "check-03"], ["check-04"]]
+
+    def test_since(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+        seed(5)
+
+        response = get(since=(START + timedelta(minutes=3)).isoformat())
+
+        assert [row["id"] for row in response.json()] == ["check-03", "check-04"]
+        assert "x-next-cursor" not in response.headers
+
+    def test_invalid_cursor(self, monkeypatch):
+        monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+
+        assert get(cursor="not-a-cursor").status_code == 400
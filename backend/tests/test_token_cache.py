@@ -0,0 +1,48 @@
+"""
+Verified token payloads are cached, but never past the token's exp
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+import auth
+from auth import create_access_token, decode_access_token, token_cache
+
+
+def cache_key(token):
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TestTokenCache:
+    def test_cached_payload_is_reused(self):
+        token_cache.clear()
+        token = create_access_token(data={"sub": "cached@example.com"})
+
+        first = decode_access_token(token)
+
+        assert token_cache.get(cache_key(token)) is first
+        assert decode_access_token(token) is first
+
+    def test_entry_expires_no_later_than_the_token(self):
+        token_cache.clear()
+        token = create_access_token(data={"sub": "short@example.com"}, expires_delta=timedelta(seconds=60))
+
+        payload = decode_access_token(token)
+
+        _, expires_at = token_cache._data[cache_key(token)]
+        token_left = payload["exp"] - time.time()
+        # The cache and token clocks differ (monotonic vs wall); allow 10ms
+        assert expires_at - token_cache.clock() <= token_left + 0.01
+        assert auth.TOKEN_CACHE_TTL_SECONDS > 60
+
+    def test_token_stops_validating_at_exp(self):
+        token_cache.clear()
+        token = create_access_token(data={"sub": "expiring@example.com"}, expires_delta=timedelta(seconds=1))
+        payload = decode_access_token(token)
+        assert payload is not None
+
+        # jose compares exp with the current time in whole seconds
+        time.sleep(max(0, payload["exp"] + 1 - time.time()) + 0.1)
+
+        assert decode_access_token(token) is None
+        assert token_cache.get(cache_key(token)) is None
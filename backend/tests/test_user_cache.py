@@ -0,0 +1,65 @@
+"""
+Cached users are dropped when a write changes them
+"""
+import asyncio
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import routes.admin
+import routes.reflections
+import server
+from auth import create_access_token
+from payment_access import unlock_user_access
+from routes.auth import get_current_user, user_cache
+
+EMAIL = "cached@example.com"
+
+
+def setup_user(monkeypatch, **fields):
+    monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+    monkeypatch.setattr(routes.reflections, "db", database.db)
+    user_cache.clear()
+    asyncio.run(database.db.users.insert_one({
+        "id": "user-1", "email": EMAIL, "hashed_password": "x",
+        "has_paid": False, "is_beta_tester": False, "free_reflections_used": 0, **fields
+    }))
+    authorization = f"Bearer {create_access_token(data={'sub': EMAIL})}"
+    return lambda: asyncio.run(get_current_user(authorization))
+
+
+class TestUserCacheEviction:
+    def test_payment_unlock_evicts_the_cached_user(self, monkeypatch):
+        current_user = setup_user(monkeypatch)
+        asyncio.run(database.db.payment_transactions.insert_one(
+            {"session_id": "cs_1", "user_id": "user-1", "email": EMAIL, "payment_status": "pending"}
+        ))
+        assert current_user().has_paid is False
+        assert user_cache.get(EMAIL) is not None
+
+        assert asyncio.run(unlock_user_access(database.db, "cs_1", "user-1", EMAIL)) is True
+
+        assert user_cache.get(EMAIL) is None
+        assert current_user().has_paid is True
+
+    def test_free_usage_write_evicts_the_cached_user(self, monkeypatch):
+        monkeypatch.setattr(routes.reflections, "FREE_REFLECTION_LIMIT", 3)
+        current_user = setup_user(monkeypatch)
+
+        asyncio.run(routes.reflections.increment_free_usage(current_user()))
+
+        assert user_cache.get(EMAIL) is None
+        assert current_user().free_reflections_used == 1
+
+
+def test_cache_stats_require_admin_key(monkeypatch):
+    monkeypatch.setattr(routes.admin, "ADMIN_API_KEY", "admin-key")
+
+    async def get(headers):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/cache-stats", headers=headers)
+
+    assert asyncio.run(get({})).status_code == 401
+    assert set(asyncio.run(get({"X-Admin-Key": "admin-key"})).json()) == {"users", "tokens", "checkout_status"}
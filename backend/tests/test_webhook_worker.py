@@ -0,0 +1,77 @@
+"""
+Webhook inbox worker: per-event outcomes and lease reclaims
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+import webhook_worker
+from webhook_worker import WEBHOOK_MAX_ATTEMPTS, WebhookWorker
+
+
+def event(event_id, **fields):
+    now = datetime.utcnow()
+    return {
+        "event_id": event_id,
+        "event_type": "checkout.session.completed",
+        "session_id": f"cs_{event_id}",
+        "payment_status": "paid",
+        "metadata": {"user_id": f"user-{event_id}", "email": f"{event_id}@example.com"},
+        "status": "pending",
+        "attempts": 0,
+        "received_at": now,
+        "next_attempt_at": now,
+        **fields
+    }
+
+
+def statuses(db):
+    async def read():
+        return {e["event_id"]: (e["status"], e["attempts"]) async for e in db.payment_events.find()}
+    return asyncio.run(read())
+
+
+class TestWebhookWorker:
+    def make_db(self, *events):
+        db = AsyncMongoMockClient()["webhook_worker_test"]
+        asyncio.run(db.payment_events.insert_many(list(events)))
+        return db
+
+    def test_one_bad_event_does_not_retry_the_batch(self, monkeypatch):
+        applied = []
+
+        async def unlock(db, session_id, user_id, email):
+            if session_id == "cs_bad":
+                raise RuntimeError("provider said no")
+            applied.append(session_id)
+
+        monkeypatch.setattr(webhook_worker, "unlock_user_access", unlock)
+        db = self.make_db(event("a"), event("bad"), event("b", payment_status="unpaid"))
+        worker = WebhookWorker(db)
+
+        assert asyncio.run(worker.process_batch()) == 3
+
+        assert applied == ["cs_a"]
+        assert statuses(db) == {"a": ("done", 0), "bad": ("pending", 1), "b": ("done", 0)}
+        assert (worker.processed, worker.failed) == (2, 0)
+
+    def test_expired_lease_counts_as_an_attempt(self, monkeypatch):
+        applied = []
+
+        async def unlock(db, session_id, user_id, email):
+            applied.append(session_id)
+
+        monkeypatch.setattr(webhook_worker, "unlock_user_access", unlock)
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        db = self.make_db(
+            event("crashed", status="processing", locked_until=expired, attempts=1),
+            event("poison", status="processing", locked_until=expired, attempts=WEBHOOK_MAX_ATTEMPTS - 1)
+        )
+        worker = WebhookWorker(db)
+
+        asyncio.run(worker.process_batch())
+
+        assert applied == ["cs_crashed"]
+        assert statuses(db) == {"crashed": ("done", 2), "poison": ("failed", WEBHOOK_MAX_ATTEMPTS)}
+        assert worker.failed == 1
@@ -0,0 +1,217 @@
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from payment_access import unlock_user_access
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", 100))
+WEBHOOK_POLL_SECONDS = float(os.environ.get("WEBHOOK_POLL_SECONDS", 2))
+WEBHOOK_LEASE_SECONDS = float(os.environ.get("WEBHOOK_LEASE_SECONDS", 60))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", 8))
+
+
+async def enqueue_webhook_event(db, webhook_response) -> bool:
+    """
+    Persist a verified provider event to the payment_events inbox.
+    Returns False if the event ID was already received.
+    """
+    now = datetime.utcnow()
+    try:
+        await db.payment_events.insert_one({
+            "event_id": webhook_response.event_id,
+            "event_type": webhook_response.event_type,
+            "session_id": webhook_response.session_id,
+            "payment_status": webhook_response.payment_status,
+            "metadata": webhook_response.metadata or {},
+            "status": "pending",
+            "attempts": 0,
+            "received_at": now,
+            "next_attempt_at": now
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: 2s, 4s, 8s ... capped at 10 minutes"""
+    return timedelta(seconds=min(2 ** attempts, 600))
+
+
+class WebhookWorker:
+    """
+    Drains the payment_events inbox in the background.
+
+    Events are claimed in batches with a lease, so a crashed worker's
+    claims become available again, and each batch is applied concurrently
+    through the conditional unlock routine, which is safe to repeat.
+    Events that succeed are marked done; each failed event is retried on
+    its own with exponential backoff until WEBHOOK_MAX_ATTEMPTS. A reclaim
+    after an expired lease counts as an attempt, so an event that crashes
+    or hangs the worker is not retried forever.
+    """
+
+    def __init__(self, db, batch_size: int = WEBHOOK_BATCH_SIZE, poll_interval: float = WEBHOOK_POLL_SECONDS):
+        self.db = db
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.failed = 0
+        self.last_batch_lag_seconds = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Wake the worker early after a new event is enqueued"""
+        self._wakeup.set()
+
+    async def stop(self):
+        """Let the current batch finish, then stop"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                logger.error("Webhook worker error: %s", e)
+                claimed = 0
+
+            # Keep draining while batches come back full
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def _claimable(self, now: datetime) -> dict:
+        return {
+            "$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "processing", "locked_until": {"$lte": now}}
+            ]
+        }
+
+    async def _claim(self) -> list:
+        now = datetime.utcnow()
+        cursor = self.db.payment_events.find(self._claimable(now), {"_id": 0, "event_id": 1})
+        candidates = await cursor.sort("received_at", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+
+        candidate_ids = [c["event_id"] for c in candidates]
+        claim_id = str(uuid.uuid4())
+        claim = {
+            "status": "processing",
+            "claim_id": claim_id,
+            "locked_until": now + timedelta(seconds=WEBHOOK_LEASE_SECONDS)
+        }
+        # An expired lease means the last attempt crashed or hung the
+        # worker, so it counts as a failed attempt
+        await self.db.payment_events.update_many(
+            {"event_id": {"$in": candidate_ids}, "status": "processing", "locked_until": {"$lte": now}},
+            {"$set": claim, "$inc": {"attempts": 1}}
+        )
+        await self.db.payment_events.update_many(
+            {"event_id": {"$in": candidate_ids}, "status": "pending", "next_attempt_at": {"$lte": now}},
+            {"$set": claim}
+        )
+        events = await self.db.payment_events.find({"claim_id": claim_id}, {"_id": 0}).to_list(self.batch_size)
+
+        exhausted = [e for e in events if e.get("attempts", 0) >= WEBHOOK_MAX_ATTEMPTS]
+        for event in exhausted:
+            await self._fail(event, event["attempts"], now)
+        return [e for e in events if e.get("attempts", 0) < WEBHOOK_MAX_ATTEMPTS]
+
+    async def _apply(self, events: list) -> list:
+        """Apply each event; returns the exception per event, or None"""
+        async def apply_one(event):
+            if event["payment_status"] != "paid":
+                return
+            await unlock_user_access(
+                self.db,
+                event["session_id"],
+                event["metadata"].get("user_id"),
+                event["metadata"].get("email")
+            )
+
+        return await asyncio.gather(*[apply_one(e) for e in events], return_exceptions=True)
+
+    async def process_batch(self) -> int:
+        """Claim and apply one batch of events; returns how many were claimed"""
+        events = await self._claim()
+        if not events:
+            return 0
+
+        results = await self._apply(events)
+        succeeded = [e for e, error in zip(events, results) if error is None]
+        failed = [(e, error) for e, error in zip(events, results) if error is not None]
+
+        now = datetime.utcnow()
+        if succeeded:
+            await self.db.payment_events.update_many(
+                {"event_id": {"$in": [e["event_id"] for e in succeeded]}},
+                {"$set": {"status": "done", "processed_at": now}, "$unset": {"claim_id": "", "locked_until": ""}}
+            )
+            self.processed += len(succeeded)
+            self.last_batch_lag_seconds = max((now - e["received_at"]).total_seconds() for e in succeeded)
+        for event, error in failed:
+            logger.error("Webhook event %s failed, will retry: %s", event["event_id"], error)
+            await self._schedule_retry(event, now)
+        return len(events)
+
+    async def _schedule_retry(self, event: dict, now: datetime):
+        attempts = event.get("attempts", 0) + 1
+        if attempts >= WEBHOOK_MAX_ATTEMPTS:
+            await self._fail(event, attempts, now)
+            return
+        await self.db.payment_events.update_one(
+            {"event_id": event["event_id"]},
+            {
+                "$set": {"status": "pending", "attempts": attempts, "next_attempt_at": now + retry_delay(attempts)},
+                "$unset": {"claim_id": "", "locked_until": ""}
+            }
+        )
+
+    async def _fail(self, event: dict, attempts: int, now: datetime):
+        self.failed += 1
+        logger.error("Webhook event %s failed after %s attempts", event["event_id"], attempts)
+        await self.db.payment_events.update_one(
+            {"event_id": event["event_id"]},
+            {
+                "$set": {"status": "failed", "attempts": attempts, "failed_at": now},
+                "$unset": {"claim_id": "", "locked_until": ""}
+            }
+        )
+
+    async def stats(self) -> dict:
+        """Queue depth and processing lag for monitoring"""
+        depth = await self.db.payment_events.count_documents({"status": {"$in": ["pending", "processing"]}})
+        oldest = await self.db.payment_events.find_one(
+            {"status": {"$in": ["pending", "processing"]}},
+            {"_id": 0, "received_at": 1},
+            sort=[("received_at", ASCENDING)]
+        )
+        lag = (datetime.utcnow() - oldest["received_at"]).total_seconds() if oldest else 0.0
+        return {
+            "queue_depth": depth,
+            "oldest_pending_lag_seconds": round(lag, 3),
+            "last_batch_lag_seconds": round(self.last_batch_lag_seconds, 3),
+            "processed": self.processed,
+            "failed": self.failed
+        }